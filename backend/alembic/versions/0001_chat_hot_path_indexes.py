@@ -0,0 +1,58 @@
+"""Add indexes for chat hot-path queries
+
+Covers the conversation history scan (messages by conversation in
+created_at order), the per-user conversation list ordered by updated_at and
+active API key lookups. Indexes are built with CREATE INDEX CONCURRENTLY so
+the migration can run against a live database without blocking writes.
+
+Run from ``backend/`` with ``alembic -c app/alembic.ini upgrade head`` and
+verify plans with ``python scripts/explain_hot_queries.py``.
+
+Revision ID: 0001_chat_hot_path_indexes
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_chat_hot_path_indexes'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_conversation_id_created_at",
+            "messages",
+            ["conversation_id", "created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_conversations_user_id_updated_at",
+            "conversations",
+            ["user_id", "updated_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_user_api_keys_user_id_active",
+            "user_api_keys",
+            ["user_id", "id"],
+            postgresql_where=sa.text("is_active"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_user_api_keys_user_id_active", table_name="user_api_keys", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_conversations_user_id_updated_at", table_name="conversations", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_messages_conversation_id_created_at", table_name="messages", postgresql_concurrently=True, if_exists=True)
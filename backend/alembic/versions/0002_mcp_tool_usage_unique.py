@@ -0,0 +1,67 @@
+"""Make MCP tool usage unique per user, server and tool
+
+Usage statistics are written as ``INSERT ... ON CONFLICT DO UPDATE``
+increments, which need a unique index on (user_id, mcp_server_id,
+tool_name). Existing duplicate rows are merged into the oldest row first;
+the index is then built with CREATE INDEX CONCURRENTLY.
+
+Revision ID: 0002_mcp_tool_usage_unique
+Revises: 0001_chat_hot_path_indexes
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_mcp_tool_usage_unique'
+down_revision = '0001_chat_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(sa.text("""
+        WITH totals AS (
+            SELECT MIN(id) AS keep_id,
+                   SUM(COALESCE(frequency, 0)) AS frequency,
+                   SUM(COALESCE(success_count, 0)) AS success_count,
+                   SUM(COALESCE(error_count, 0)) AS error_count,
+                   MAX(last_used) AS last_used
+            FROM mcp_tool_usage
+            GROUP BY user_id, mcp_server_id, tool_name
+            HAVING COUNT(*) > 1
+        )
+        UPDATE mcp_tool_usage AS u
+        SET frequency = t.frequency,
+            success_count = t.success_count,
+            error_count = t.error_count,
+            last_used = t.last_used
+        FROM totals AS t
+        WHERE u.id = t.keep_id
+    """))
+    op.execute(sa.text("""
+        DELETE FROM mcp_tool_usage AS u
+        USING mcp_tool_usage AS keep
+        WHERE u.user_id = keep.user_id
+          AND u.mcp_server_id = keep.mcp_server_id
+          AND u.tool_name = keep.tool_name
+          AND u.id > keep.id
+    """))
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_mcp_tool_usage_user_server_tool",
+            "mcp_tool_usage",
+            ["user_id", "mcp_server_id", "tool_name"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("uq_mcp_tool_usage_user_server_tool", table_name="mcp_tool_usage", postgresql_concurrently=True, if_exists=True)
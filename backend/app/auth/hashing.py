@@ -0,0 +1,150 @@
+"""
+Off-loop password hashing with bounded concurrency for bcrypt
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from .utils import pwd_context
+from ..metrics import record_password_hash, password_hash_in_flight
+
+# Password hashing configuration
+class HashingConfig:
+    # bcrypt releases the GIL, so threads hash in parallel up to this cap
+    MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+    # Calls allowed to wait for a hashing thread before failing fast
+    MAX_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    # Calibrate bcrypt rounds to this per-hash cost at startup (0 disables)
+    TARGET_HASH_MS = float(os.getenv("BCRYPT_TARGET_MS", "0"))
+    MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+    MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "15"))
+
+class HasherSaturatedError(Exception):
+    """Raised when the hashing queue is full"""
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated thread pool and keeps the event loop free"""
+
+    def __init__(self, max_concurrency: int, max_queue_depth: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="bcrypt")
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+    def _timed(self, operation: str, fn: Callable, queued_at: float, *args):
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            result = fn(*args)
+            outcome = "completed"
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                if outcome == "completed":
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.wait_seconds_total += started - queued_at
+                self.hash_seconds_total += elapsed
+                self.hash_seconds_max = max(self.hash_seconds_max, elapsed)
+            record_password_hash(operation, outcome, started - queued_at, elapsed)
+
+    def _release(self, future):
+        # Runs once the executor is done with the call, even if its caller was cancelled
+        with self._stats_lock:
+            self.in_flight -= 1
+        password_hash_in_flight.dec()
+
+    async def _run(self, operation: str, fn: Callable, *args):
+        with self._stats_lock:
+            saturated = self.in_flight >= self.max_concurrency + self.max_queue_depth
+            if saturated:
+                self.rejected += 1
+            else:
+                self.in_flight += 1
+        if saturated:
+            record_password_hash(operation, "rejected")
+            raise HasherSaturatedError("Password hashing capacity exceeded")
+
+        password_hash_in_flight.inc()
+        try:
+            future = self._executor.submit(self._timed, operation, fn, time.perf_counter(), *args)
+        except RuntimeError:
+            # Executor shut down
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A queued call is dropped; a running one finishes in its thread and still counts as in flight
+            with self._stats_lock:
+                self.cancelled += 1
+            record_password_hash(operation, "cancelled")
+            raise
+
+    async def hash(self, password: str) -> str:
+        """Hash a password for storing"""
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash"""
+        return await self._run("verify", pwd_context.verify, plain_password, hashed_password)
+
+    async def calibrate(self, target_ms: float = HashingConfig.TARGET_HASH_MS) -> int:
+        """Pick bcrypt rounds so one hash costs about target_ms on this host"""
+        rounds = pwd_context.handler("bcrypt").default_rounds
+        if target_ms <= 0:
+            return rounds
+
+        probe_rounds = HashingConfig.MIN_ROUNDS
+        probe = pwd_context.handler("bcrypt").using(rounds=probe_rounds)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        await loop.run_in_executor(self._executor, probe.hash, "calibration-probe")
+        probe_ms = (time.perf_counter() - started) * 1000
+
+        # Each extra round doubles the cost
+        rounds = probe_rounds + round(math.log2(max(target_ms / max(probe_ms, 0.001), 1e-6)))
+        rounds = min(max(rounds, HashingConfig.MIN_ROUNDS), HashingConfig.MAX_ROUNDS)
+        pwd_context.update(bcrypt__rounds=rounds)
+        print(f"✓ bcrypt calibrated to {rounds} rounds ({probe_ms:.0f}ms at {probe_rounds} rounds)")
+        return rounds
+
+    def stats(self) -> dict:
+        """Get hashing statistics"""
+        executed = self.completed + self.failed
+        return {
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "hash_seconds_total": self.hash_seconds_total,
+            "hash_seconds_max": self.hash_seconds_max,
+            "hash_seconds_avg": self.hash_seconds_total / executed if executed else 0.0,
+            "wait_seconds_total": self.wait_seconds_total,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+# Global instance
+password_hasher = PasswordHasher(
+    max_concurrency=HashingConfig.MAX_CONCURRENCY,
+    max_queue_depth=HashingConfig.MAX_QUEUE_DEPTH,
+)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Embedding backfill script
+Embeds existing message history into the configured vector stores and
+records each message's vector IDs. Resumable from a checkpoint file.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add the current directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import select, func, bindparam
+
+from database import engine, Message, Conversation
+from vector.ingest import EMBEDDED_ROLES, message_metadata, IngestConfig
+from vector.routing import vector_router
+
+DEFAULT_CHECKPOINT = "./data/backfill_embeddings.json"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Embed existing messages into the vector stores")
+    parser.add_argument("--batch-size", type=int, default=512, help="messages per embedding batch")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="embedding processes")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="math library threads per process")
+    parser.add_argument("--window", type=int, default=20000, help="rows read per server-side cursor before reopening")
+    parser.add_argument("--update-batch", type=int, default=1000, help="rows per vector_ids UPDATE transaction")
+    parser.add_argument("--rate", type=float, default=0, help="max messages per second (0 = unlimited)")
+    parser.add_argument("--nice", type=int, default=10, help="niceness added to embedding processes")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--reset", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--allow-embedded-stores", action="store_true",
+                        help="also write to single-process stores (only while the API is stopped)")
+    return parser.parse_args()
+
+# Checkpointing
+def load_checkpoint(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_checkpoint(path: str, state: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({**state, "updated_at": time.time()}, f)
+    os.replace(tmp, path)
+
+# Embedding processes
+def _init_worker(threads: int, niceness: int):
+    # Must be set before torch is imported in this process
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "TOKENIZERS_PARALLELISM"):
+        os.environ[name] = "false" if name == "TOKENIZERS_PARALLELISM" else str(threads)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if niceness:
+        os.nice(niceness)
+
+def _embed_texts(texts):
+    from vector.embeddings import embedder
+    return embedder.embed(texts, use_cache=False)
+
+# Reading
+def stream_batches(last_id: int, max_id: int, batch_size: int, window: int):
+    """Yield row batches in primary-key order.
+
+    Each window is read through a server-side cursor in its own short
+    transaction, so a long backfill never pins one snapshot for hours.
+    """
+    while last_id < max_id:
+        query = (
+            select(
+                Message.id, Message.content, Message.role, Message.conversation_id,
+                Message.created_at, Conversation.user_id
+            )
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(
+                Message.id > last_id,
+                Message.id <= max_id,
+                Message.role.in_(EMBEDDED_ROLES),
+                Message.vector_ids.is_(None),
+            )
+            .order_by(Message.id)
+            .limit(window)
+        )
+        rows_read = 0
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+            for rows in result.partitions():
+                rows_read += len(rows)
+                last_id = rows[-1].id
+                yield rows
+        if rows_read < window:
+            return
+
+# Writing
+vector_ids_update = (
+    Message.__table__.update()
+    .where(Message.__table__.c.id == bindparam("row_id"))
+    .values(vector_ids=bindparam("row_vector_ids"))
+)
+
+def write_batch(stores, rows, embeddings, update_batch: int):
+    ids = [str(row.id) for row in rows]
+    documents = [row.content for row in rows]
+    metadatas = [message_metadata(row.conversation_id, row.user_id, row.role, row.created_at) for row in rows]
+    for store in stores:
+        for start in range(0, len(rows), store.write_batch_size):
+            end = start + store.write_batch_size
+            store.upsert(ids[start:end], embeddings[start:end], documents[start:end], metadatas[start:end])
+
+    params = [{"row_id": row.id, "row_vector_ids": [str(row.id)]} for row in rows]
+    for start in range(0, len(params), update_batch):
+        with engine.begin() as conn:
+            conn.execute(vector_ids_update, params[start:start + update_batch])
+
+class Throttle:
+    """Caps throughput at a number of messages per second"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.count = 0
+
+    def wait(self, count: int):
+        self.count += count
+        if self.rate > 0:
+            ahead = self.count / self.rate - (time.monotonic() - self.started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+def backfill(args):
+    state = {} if args.reset else load_checkpoint(args.checkpoint)
+    with engine.connect() as conn:
+        max_id = state.get("max_id") or conn.execute(select(func.max(Message.id))).scalar() or 0
+    # Messages created after the backfill started are handled by the live ingestion pipeline
+    state = {"last_id": state.get("last_id", 0), "max_id": max_id, "processed": state.get("processed", 0)}
+
+    stores = vector_router.route(IngestConfig.COLLECTION_NAME)
+    embedded_stores = [store.name for store in stores if not store.shared]
+    if embedded_stores and not args.allow_embedded_stores:
+        print(f"❌ Refusing to write to single-process stores while the API may be running: {', '.join(embedded_stores)}")
+        print("   Set CHROMA_HOST to use a Chroma server, or stop the API and pass --allow-embedded-stores")
+        sys.exit(1)
+    if not stores:
+        print("❌ No vector stores are configured")
+        sys.exit(1)
+
+    print(f"Backfilling messages {state['last_id'] + 1}..{max_id} into {', '.join(s.name for s in stores)}")
+    throttle = Throttle(args.rate)
+    started = time.monotonic()
+    done_this_run = 0
+    pending = deque()
+
+    def finish(rows, future):
+        nonlocal done_this_run
+        write_batch(stores, rows, future.result(), args.update_batch)
+        done_this_run += len(rows)
+        state["last_id"] = rows[-1].id
+        state["processed"] += len(rows)
+        save_checkpoint(args.checkpoint, state)
+        rate = done_this_run / max(time.monotonic() - started, 1e-6)
+        print(f"  ✓ up to id {state['last_id']} ({state['processed']} total, {rate:.0f} msg/s)")
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(args.threads_per_worker, args.nice),
+    ) as pool:
+        try:
+            for rows in stream_batches(state["last_id"], max_id, args.batch_size, args.window):
+                throttle.wait(len(rows))
+                pending.append((rows, pool.submit(_embed_texts, [row.content for row in rows])))
+                # Batches complete in order so the checkpoint only moves forward
+                while len(pending) >= args.workers * 2:
+                    finish(*pending.popleft())
+            while pending:
+                finish(*pending.popleft())
+        except KeyboardInterrupt:
+            for _, future in pending:
+                future.cancel()
+            print(f"⚠️  Interrupted; resume from id {state['last_id']} with the same command")
+            sys.exit(130)
+
+    print(f"✅ Backfill complete: {state['processed']} messages embedded")
+
+if __name__ == "__main__":
+    backfill(parse_args())
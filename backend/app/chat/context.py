@@ -0,0 +1,214 @@
+"""
+Token-budgeted context window builder for provider requests
+"""
+
+import os
+import asyncio
+from functools import lru_cache
+from typing import Any, List, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .history_cache import history_cache
+
+try:
+    import tiktoken
+    from tiktoken.model import MODEL_TO_ENCODING, MODEL_PREFIX_TO_ENCODING
+except ImportError:  # Fall back to the character-based estimate
+    tiktoken = None
+
+# Context window configuration
+class ContextConfig:
+    # Tokens kept free for the model's answer (matches max_tokens in the router)
+    COMPLETION_TOKENS = int(os.getenv("CONTEXT_COMPLETION_TOKENS", "2048"))
+    # Tokens reserved for the vector-search system message
+    VECTOR_CONTEXT_TOKENS = int(os.getenv("CONTEXT_VECTOR_RESERVE_TOKENS", "512"))
+    # Rows fetched per round trip while walking back through history
+    HISTORY_PAGE_SIZE = int(os.getenv("CONTEXT_HISTORY_PAGE_SIZE", "50"))
+    # Window used for models not listed below
+    DEFAULT_CONTEXT_WINDOW = int(os.getenv("CONTEXT_DEFAULT_WINDOW", "4096"))
+
+# Context window sizes by model name prefix (longest prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-3.5-turbo-1106": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4o": 128000,
+}
+
+# Per-message framing overhead of the chat format
+TOKENS_PER_MESSAGE = 4
+# Tokens used to prime the assistant reply
+REPLY_PRIMING_TOKENS = 3
+# Tokens used by the instructions wrapped around vector-search context
+VECTOR_CONTEXT_PROMPT_TOKENS = 32
+
+# Encoding for models tiktoken does not know
+DEFAULT_ENCODING = "cl100k_base"
+
+# Loaded by load_encodings(); until then token counts use the character estimate
+_encodings: Dict[str, Any] = {}
+
+@lru_cache(maxsize=32)
+def _encoding_name(model: str) -> str:
+    if model in MODEL_TO_ENCODING:
+        return MODEL_TO_ENCODING[model]
+    for prefix, name in MODEL_PREFIX_TO_ENCODING.items():
+        if model.startswith(prefix):
+            return name
+    return DEFAULT_ENCODING
+
+def _get_encoding(model: str):
+    """Get the tokenizer for a model (None when tiktoken is unavailable or not loaded)"""
+    if tiktoken is None:
+        return None
+    return _encodings.get(_encoding_name(model)) or _encodings.get(DEFAULT_ENCODING)
+
+def load_encodings():
+    """Load the tokenizers of known models.
+
+    tiktoken downloads BPE files on first use, so call this off the event
+    loop. A tokenizer that fails to load stays on the character estimate.
+    """
+    if tiktoken is None:
+        return
+    for name in sorted({DEFAULT_ENCODING} | {_encoding_name(model) for model in MODEL_CONTEXT_WINDOWS}):
+        if name in _encodings:
+            continue
+        try:
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            print(f"⚠️  Tokenizer {name} unavailable, using character estimates: {e}")
+
+async def warm_up_encodings():
+    """Load tokenizers in the background after startup"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, load_encodings)
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Count tokens in text for a model"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def count_message_tokens(message: Dict[str, str], model: str = "gpt-3.5-turbo") -> int:
+    """Count tokens for a single chat message including framing"""
+    return TOKENS_PER_MESSAGE + count_tokens(message["content"], model)
+
+def fit_to_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """Truncate text to at most max_tokens tokens"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def get_context_window(model: str) -> int:
+    """Get the context window size for a model"""
+    best = None
+    for prefix in MODEL_CONTEXT_WINDOWS:
+        if model.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return MODEL_CONTEXT_WINDOWS[best] if best else ContextConfig.DEFAULT_CONTEXT_WINDOW
+
+def get_history_budget(model: str, reserve_vector_context: bool = False) -> int:
+    """Get the number of tokens available for conversation history"""
+    budget = get_context_window(model) - ContextConfig.COMPLETION_TOKENS - REPLY_PRIMING_TOKENS
+    if reserve_vector_context:
+        budget -= ContextConfig.VECTOR_CONTEXT_TOKENS + TOKENS_PER_MESSAGE
+    return max(budget, 0)
+
+def _select_from_cache(entry, model: str, budget: int, required: bool):
+    """Pick the newest cached messages within budget.
+
+    Returns None when the cached tail runs out before the budget does and
+    older messages may still exist in the database.
+    """
+    if entry.token_model != model:
+        entry.tokens = [None] * len(entry.messages)
+        entry.token_model = model
+
+    selected: List[Dict[str, str]] = []
+    used = 0
+    for index in range(len(entry.messages) - 1, -1, -1):
+        tokens = entry.tokens[index]
+        if tokens is None:
+            tokens = entry.tokens[index] = count_message_tokens(entry.messages[index], model)
+        if (selected or not required) and used + tokens > budget:
+            return selected[::-1]
+        selected.append(entry.messages[index])
+        used += tokens
+    return selected[::-1] if entry.complete else None
+
+async def build_context_window(
+    db: AsyncSession,
+    conversation_id: Optional[int],
+    model: str,
+    reserve_vector_context: bool = False,
+    pending: Optional[List[Dict[str, str]]] = None
+) -> List[Dict[str, str]]:
+    """Build provider messages from the newest history that fits the budget.
+
+    ``pending`` messages (the not yet persisted user turn) are always
+    included and charged against the budget first. Hot conversations are
+    served from the in-memory history cache. Otherwise history is read
+    newest-first a page at a time and reading stops as soon as the budget
+    is spent, so long conversations cost no more than short ones. The most
+    recent stored message is always included when there is no pending one.
+    """
+    pending = list(pending or [])
+    budget = get_history_budget(model, reserve_vector_context)
+    if pending:
+        budget = max(budget - sum(count_message_tokens(m, model) for m in pending), 0)
+    if conversation_id is None:
+        return pending
+
+    entry = history_cache.get(conversation_id)
+    if entry is not None:
+        selected = _select_from_cache(entry, model, budget, required=not pending)
+        if selected is not None:
+            return selected + pending
+
+    selected: List[Dict[str, str]] = []
+    tokens_selected: List[int] = []
+    used = 0
+    before = None
+    complete = False
+
+    while True:
+        rows = await crud.get_recent_messages(
+            db,
+            conversation_id=conversation_id,
+            limit=ContextConfig.HISTORY_PAGE_SIZE,
+            before=before
+        )
+        exhausted = False
+        for row in rows:
+            message = {"role": row.role, "content": row.content}
+            tokens = count_message_tokens(message, model)
+            if (selected or pending) and used + tokens > budget:
+                exhausted = True
+                break
+            selected.append(message)
+            tokens_selected.append(tokens)
+            used += tokens
+
+        if exhausted:
+            break
+        if len(rows) < ContextConfig.HISTORY_PAGE_SIZE:
+            complete = True
+            break
+        before = (rows[-1].created_at, rows[-1].id)
+
+    selected.reverse()
+    tokens_selected.reverse()
+    history_cache.put(conversation_id, selected, complete=complete, tokens=tokens_selected, token_model=model)
+    return selected + pending
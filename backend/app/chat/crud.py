@@ -2,98 +2,202 @@
 CRUD operations for chat functionality
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from datetime import datetime
+from typing import Optional, Tuple, List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func, desc, tuple_
 from ..database import Conversation, Message, UserAPIKey
 from .. import schemas
+from ..security import invalidate_cached_api_key
+from .history_cache import history_cache
+from ..vector import vector_manager
+from ..vector.ingest import EMBEDDED_ROLES
+from ..timing import span
+
+def _queue_embeddings(user_id: int, messages: List[Message]):
+    """Hand committed messages to the background embedding pipeline"""
+    for m in messages:
+        if m.role in EMBEDDED_ROLES:
+            vector_manager.add_message_embedding(
+                m.id, m.content, m.conversation_id, user_id, m.role, m.created_at
+            )
 
 # Conversation CRUD
-def create_conversation(db: Session, title: str, user_id: int) -> Conversation:
+async def create_conversation(db: AsyncSession, title: str, user_id: int) -> Conversation:
     """Create a new conversation"""
     db_conversation = Conversation(title=title, user_id=user_id)
     db.add(db_conversation)
-    db.commit()
-    db.refresh(db_conversation)
+    await db.commit()
     return db_conversation
 
-def get_conversation(db: Session, conversation_id: int, user_id: int) -> Conversation:
+async def get_conversation(db: AsyncSession, conversation_id: int, user_id: int) -> Conversation:
     """Get a conversation by ID and user ID"""
-    return db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == user_id
-    ).first()
-
-def get_user_conversations(db: Session, user_id: int, skip: int = 0, limit: int = 50) -> list[Conversation]:
-    """Get all conversations for a user"""
-    return db.query(Conversation).filter(
-        Conversation.user_id == user_id
-    ).order_by(desc(Conversation.updated_at)).offset(skip).limit(limit).all()
-
-def update_conversation(db: Session, conversation_id: int, updates: schemas.ConversationUpdate) -> Conversation:
+    with span("db_conversation"):
+        result = await db.execute(select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == user_id
+        ))
+        return result.scalars().first()
+
+async def get_user_conversations(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 50,
+    before: Optional[Tuple[datetime, int]] = None,
+    after: Optional[Tuple[datetime, int]] = None
+) -> list[Conversation]:
+    """Get conversations for a user, most recently updated first.
+
+    ``before``/``after`` are ``(updated_at, id)`` keyset positions; with
+    ``after`` the page of newer conversations adjacent to the cursor is
+    returned (still newest first).
+    """
+    query = select(Conversation).where(Conversation.user_id == user_id)
+    position = tuple_(Conversation.updated_at, Conversation.id)
+    if after is not None:
+        result = await db.execute(
+            query.where(position > tuple_(*after))
+            .order_by(Conversation.updated_at, Conversation.id).offset(skip).limit(limit)
+        )
+        return list(result.scalars().all())[::-1]
+    if before is not None:
+        query = query.where(position < tuple_(*before))
+    result = await db.execute(
+        query.order_by(desc(Conversation.updated_at), desc(Conversation.id)).offset(skip).limit(limit)
+    )
+    return list(result.scalars().all())
+
+async def update_conversation(db: AsyncSession, conversation_id: int, updates: schemas.ConversationUpdate) -> Conversation:
     """Update a conversation"""
-    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    result = await db.execute(select(Conversation).where(Conversation.id == conversation_id))
+    conversation = result.scalars().first()
     if conversation:
         update_data = updates.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(conversation, key, value)
-        db.commit()
-        db.refresh(conversation)
+        await db.commit()
+        await db.refresh(conversation)
+        history_cache.invalidate(conversation_id)
     return conversation
 
-def update_conversation_message_count(db: Session, conversation_id: int):
-    """Update the message count for a conversation"""
-    count = db.query(Message).filter(Message.conversation_id == conversation_id).count()
-    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-    if conversation:
-        conversation.message_count = count
-        db.commit()
-
-def delete_conversation(db: Session, conversation_id: int):
+async def delete_conversation(db: AsyncSession, conversation_id: int):
     """Delete a conversation and all its messages"""
-    db.query(Message).filter(Message.conversation_id == conversation_id).delete()
-    db.query(Conversation).filter(Conversation.id == conversation_id).delete()
-    db.commit()
+    await db.execute(delete(Message).where(Message.conversation_id == conversation_id))
+    await db.execute(delete(Conversation).where(Conversation.id == conversation_id))
+    await db.commit()
+    history_cache.invalidate(conversation_id)
 
 # Message CRUD
-def create_message(
-    db: Session,
-    conversation_id: int,
-    role: str,
-    content: str,
-    model: str = None,
-    tokens_used: int = None
-) -> Message:
-    """Create a new message"""
-    db_message = Message(
-        conversation_id=conversation_id,
-        role=role,
-        content=content,
-        model=model,
-        tokens_used=tokens_used
-    )
-    db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
-    return db_message
+async def append_turn(
+    db: AsyncSession,
+    user_id: int,
+    messages: List[Dict[str, Any]],
+    conversation_id: Optional[int] = None,
+    title: Optional[str] = None
+) -> Tuple[int, List[Message]]:
+    """Persist a chat turn in a single transaction.
+
+    Creates the conversation when ``conversation_id`` is None, inserts all
+    ``messages`` (dicts of Message column values) in one flush and bumps
+    ``message_count``/``updated_at`` with an atomic increment rather than a
+    recount. Returns the conversation ID and the new messages.
+    """
+    now = datetime.utcnow()
+    new_conversation = conversation_id is None
 
-def get_conversation_messages(
-    db: Session,
+    with span("db_append_turn"):
+        if new_conversation:
+            db_conversation = Conversation(title=title, user_id=user_id, message_count=len(messages))
+            db.add(db_conversation)
+            await db.flush()
+            conversation_id = db_conversation.id
+
+        db_messages = [Message(conversation_id=conversation_id, **message) for message in messages]
+        db.add_all(db_messages)
+        await db.flush()
+
+        if not new_conversation:
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(
+                    message_count=func.coalesce(Conversation.message_count, 0) + len(db_messages),
+                    updated_at=now
+                )
+            )
+        await db.commit()
+
+    if new_conversation:
+        history_cache.put(
+            conversation_id,
+            [{"role": m.role, "content": m.content} for m in db_messages],
+            complete=True
+        )
+    else:
+        for m in db_messages:
+            history_cache.append(conversation_id, m.role, m.content)
+    _queue_embeddings(user_id, db_messages)
+
+    return conversation_id, db_messages
+
+async def get_conversation_messages(
+    db: AsyncSession,
     conversation_id: int,
     skip: int = 0,
-    limit: int = 1000
+    limit: int = 1000,
+    before: Optional[Tuple[datetime, int]] = None,
+    after: Optional[Tuple[datetime, int]] = None
 ) -> list[Message]:
-    """Get messages for a conversation"""
-    return db.query(Message).filter(
+    """Get messages for a conversation in chronological order.
+
+    ``before``/``after`` are ``(created_at, id)`` keyset positions; with
+    ``before`` the page of older messages adjacent to the cursor is returned
+    (still oldest first).
+    """
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    position = tuple_(Message.created_at, Message.id)
+    if before is not None:
+        result = await db.execute(
+            query.where(position < tuple_(*before))
+            .order_by(desc(Message.created_at), desc(Message.id)).offset(skip).limit(limit)
+        )
+        return list(result.scalars().all())[::-1]
+    if after is not None:
+        query = query.where(position > tuple_(*after))
+    result = await db.execute(
+        query.order_by(Message.created_at, Message.id).offset(skip).limit(limit)
+    )
+    return list(result.scalars().all())
+
+async def get_recent_messages(
+    db: AsyncSession,
+    conversation_id: int,
+    limit: int = 50,
+    before: Optional[Tuple[datetime, int]] = None
+):
+    """Get the newest message rows of a conversation, newest first.
+
+    ``before`` is a ``(created_at, id)`` position to continue from, so older
+    pages are read with an index range scan instead of an offset.
+    """
+    query = select(Message.id, Message.role, Message.content, Message.created_at).where(
         Message.conversation_id == conversation_id
-    ).order_by(Message.created_at).offset(skip).limit(limit).all()
+    )
+    if before is not None:
+        query = query.where(tuple_(Message.created_at, Message.id) < tuple_(*before))
+    with span("db_history"):
+        result = await db.execute(query.order_by(desc(Message.created_at), desc(Message.id)).limit(limit))
+        return result.all()
 
-def get_message(db: Session, message_id: int) -> Message:
+async def get_message(db: AsyncSession, message_id: int) -> Message:
     """Get a message by ID"""
-    return db.query(Message).filter(Message.id == message_id).first()
+    result = await db.execute(select(Message).where(Message.id == message_id))
+    return result.scalars().first()
 
 # API Key CRUD
-def create_user_api_key(
-    db: Session,
+async def create_user_api_key(
+    db: AsyncSession,
     user_id: int,
     provider: str,
     name: str,
@@ -120,38 +224,43 @@ def create_user_api_key(
         encrypted_key=encrypted_key
     )
     db.add(db_api_key)
-    db.commit()
-    db.refresh(db_api_key)
+    await db.commit()
+    await db.refresh(db_api_key)
     return db_api_key
 
-def get_user_api_keys(db: Session, user_id: int) -> list[UserAPIKey]:
+async def get_user_api_keys(db: AsyncSession, user_id: int) -> list[UserAPIKey]:
     """Get all API keys for a user"""
-    return db.query(UserAPIKey).filter(
+    result = await db.execute(select(UserAPIKey).where(
         UserAPIKey.user_id == user_id,
         UserAPIKey.is_active == True
-    ).all()
+    ))
+    return list(result.scalars().all())
 
-def get_user_api_key(db: Session, user_id: int, api_key_id: int) -> UserAPIKey:
+async def get_user_api_key(db: AsyncSession, user_id: int, api_key_id: int) -> UserAPIKey:
     """Get a specific API key for a user"""
-    return db.query(UserAPIKey).filter(
-        UserAPIKey.id == api_key_id,
-        UserAPIKey.user_id == user_id,
-        UserAPIKey.is_active == True
-    ).first()
+    with span("db_api_key"):
+        result = await db.execute(select(UserAPIKey).where(
+            UserAPIKey.id == api_key_id,
+            UserAPIKey.user_id == user_id,
+            UserAPIKey.is_active == True
+        ))
+        return result.scalars().first()
 
-def update_api_key(db: Session, api_key_id: int, user_id: int, updates: dict) -> UserAPIKey:
+async def update_api_key(db: AsyncSession, api_key_id: int, user_id: int, updates: dict) -> UserAPIKey:
     """Update an API key"""
-    api_key = get_user_api_key(db, user_id=user_id, api_key_id=api_key_id)
+    api_key = await get_user_api_key(db, user_id=user_id, api_key_id=api_key_id)
     if api_key:
         for key, value in updates.items():
             setattr(api_key, key, value)
-        db.commit()
-        db.refresh(api_key)
+        await db.commit()
+        await db.refresh(api_key)
+        invalidate_cached_api_key(api_key_id)
     return api_key
 
-def delete_api_key(db: Session, api_key_id: int, user_id: int):
+async def delete_api_key(db: AsyncSession, api_key_id: int, user_id: int):
     """Delete an API key (soft delete)"""
-    api_key = get_user_api_key(db, user_id=user_id, api_key_id=api_key_id)
+    api_key = await get_user_api_key(db, user_id=user_id, api_key_id=api_key_id)
     if api_key:
         api_key.is_active = False
-        db.commit()
+        await db.commit()
+        invalidate_cached_api_key(api_key_id)
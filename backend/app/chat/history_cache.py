@@ -0,0 +1,147 @@
+"""
+In-memory LRU cache of provider-ready conversation history
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+# History cache configuration
+class HistoryCacheConfig:
+    MAX_CONVERSATIONS = int(os.getenv("HISTORY_CACHE_MAX_CONVERSATIONS", "1000"))
+    MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    MAX_MESSAGES_PER_CONVERSATION = int(os.getenv("HISTORY_CACHE_MAX_MESSAGES", "500"))
+    # Bounds staleness when several workers write to the same conversation
+    TTL_SECONDS = float(os.getenv("HISTORY_CACHE_TTL_SECONDS", "600"))
+
+# Approximate per-message bookkeeping cost on top of the content itself
+MESSAGE_OVERHEAD_BYTES = 200
+
+class CachedHistory:
+    """Tail of a conversation in provider message format.
+
+    ``complete`` is True when ``messages`` starts at the first message of the
+    conversation. ``tokens`` holds per-message token counts for
+    ``token_model`` (None entries are counted lazily).
+    """
+
+    __slots__ = ("messages", "tokens", "token_model", "complete", "size_bytes", "expires_at")
+
+    def __init__(self, messages: List[Dict[str, str]], complete: bool, tokens: List[Optional[int]], token_model: Optional[str]):
+        self.messages = messages
+        self.tokens = tokens
+        self.token_model = token_model
+        self.complete = complete
+        self.size_bytes = sum(len(m["content"]) + MESSAGE_OVERHEAD_BYTES for m in messages)
+        self.expires_at = time.monotonic() + HistoryCacheConfig.TTL_SECONDS
+
+class ConversationHistoryCache:
+    """Bounded LRU of conversation histories keyed by conversation ID"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[int, CachedHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, conversation_id: int) -> Optional[CachedHistory]:
+        """Get a cached history, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and entry.expires_at < time.monotonic():
+                self._remove(conversation_id)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        conversation_id: int,
+        messages: List[Dict[str, str]],
+        complete: bool,
+        tokens: Optional[List[Optional[int]]] = None,
+        token_model: Optional[str] = None
+    ):
+        """Store the history tail of a conversation"""
+        entry = CachedHistory(list(messages), complete, list(tokens) if tokens else [None] * len(messages), token_model)
+        with self._lock:
+            self._remove(conversation_id)
+            self._entries[conversation_id] = entry
+            self.total_bytes += entry.size_bytes
+            self._trim(entry)
+            self._evict()
+
+    def append(self, conversation_id: int, role: str, content: str):
+        """Append a new message to a cached history (no-op when not cached)"""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return
+            entry.messages.append({"role": role, "content": content})
+            entry.tokens.append(None)
+            added = len(content) + MESSAGE_OVERHEAD_BYTES
+            entry.size_bytes += added
+            self.total_bytes += added
+            self._trim(entry)
+            self._evict()
+
+    def invalidate(self, conversation_id: int):
+        """Drop a conversation from the cache"""
+        with self._lock:
+            self._remove(conversation_id)
+
+    def clear(self):
+        """Drop all cached histories"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, conversation_id: int):
+        entry = self._entries.pop(conversation_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.size_bytes
+
+    def _trim(self, entry: CachedHistory):
+        """Cap the number of messages kept for one conversation"""
+        excess = len(entry.messages) - HistoryCacheConfig.MAX_MESSAGES_PER_CONVERSATION
+        if excess <= 0:
+            return
+        freed = sum(len(m["content"]) + MESSAGE_OVERHEAD_BYTES for m in entry.messages[:excess])
+        del entry.messages[:excess]
+        del entry.tokens[:excess]
+        entry.complete = False
+        entry.size_bytes -= freed
+        self.total_bytes -= freed
+
+    def _evict(self):
+        """Evict least recently used entries until within bounds"""
+        while self._entries and (
+            len(self._entries) > HistoryCacheConfig.MAX_CONVERSATIONS
+            or self.total_bytes > HistoryCacheConfig.MAX_BYTES
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size_bytes
+            self.evictions += 1
+
+# Global instance
+history_cache = ConversationHistoryCache()
@@ -0,0 +1,34 @@
+"""
+Opaque keyset pagination cursors for conversation and message listings
+"""
+
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Encode a (timestamp, id) position as an opaque cursor"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Decode an opaque cursor back into a (timestamp, id) position"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def decode_cursors(before: Optional[str], after: Optional[str]):
+    """Decode before/after query parameters (at most one may be given)"""
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+    return decode_cursor(before), decode_cursor(after)
@@ -0,0 +1,107 @@
+"""
+Async LLM provider clients backed by a shared, pooled HTTP transport
+"""
+
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+import httpx
+import openai
+
+# Provider connection configuration
+class ProviderConfig:
+    # Default upstream endpoint (None uses the OpenAI SDK default)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+    # Connection pool limits per upstream base URL
+    MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "500"))
+    MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PROVIDER_MAX_KEEPALIVE_CONNECTIONS", "100"))
+    KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "30"))
+
+    # Timeouts
+    CONNECT_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "10"))
+    REQUEST_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_REQUEST_TIMEOUT", "120"))
+
+    # Per-key client cache
+    MAX_CLIENTS = int(os.getenv("PROVIDER_MAX_CLIENTS", "1000"))
+    CLIENT_IDLE_SECONDS = float(os.getenv("PROVIDER_CLIENT_IDLE_SECONDS", "300"))
+
+class ProviderClientPool:
+    """Shares pooled HTTP transports between per-key async provider clients.
+
+    One ``httpx.AsyncClient`` is kept per upstream base URL so keep-alive
+    connections are reused across users. The lightweight ``AsyncOpenAI``
+    wrappers that carry each decrypted key are cached by key hash and base
+    URL, and evicted once idle or when the cache is full.
+    """
+
+    def __init__(self):
+        self._transports: Dict[Optional[str], httpx.AsyncClient] = {}
+        self._clients: "OrderedDict[Tuple[str, Optional[str]], Tuple[openai.AsyncOpenAI, float]]" = OrderedDict()
+
+    def _get_transport(self, base_url: Optional[str]) -> httpx.AsyncClient:
+        transport = self._transports.get(base_url)
+        if transport is None or transport.is_closed:
+            transport = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=ProviderConfig.MAX_CONNECTIONS,
+                    max_keepalive_connections=ProviderConfig.MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=ProviderConfig.KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=httpx.Timeout(
+                    ProviderConfig.REQUEST_TIMEOUT_SECONDS,
+                    connect=ProviderConfig.CONNECT_TIMEOUT_SECONDS,
+                ),
+            )
+            self._transports[base_url] = transport
+        return transport
+
+    def _evict_idle(self, now: float):
+        """Drop clients idle past the configured window (oldest first)"""
+        while self._clients:
+            key, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used < ProviderConfig.CLIENT_IDLE_SECONDS and len(self._clients) <= ProviderConfig.MAX_CLIENTS:
+                break
+            del self._clients[key]
+
+    def get_client(self, api_key: str, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+        """Get a cached async client for an API key and base URL"""
+        base_url = base_url or ProviderConfig.OPENAI_BASE_URL
+        cache_key = (hashlib.sha256(api_key.encode()).hexdigest(), base_url)
+        now = time.monotonic()
+
+        entry = self._clients.pop(cache_key, None)
+        if entry is None:
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=self._get_transport(base_url),
+                max_retries=2,
+            )
+        else:
+            client = entry[0]
+
+        # Re-insert at the most recently used end, then trim stale entries
+        self._clients[cache_key] = (client, now)
+        self._evict_idle(now)
+        return client
+
+    def stats(self) -> dict:
+        """Get pool statistics"""
+        return {
+            "clients": len(self._clients),
+            "transports": len(self._transports),
+        }
+
+    async def close(self):
+        """Close all pooled transports"""
+        self._clients.clear()
+        for transport in self._transports.values():
+            await transport.aclose()
+        self._transports.clear()
+
+# Global instance
+provider_pool = ProviderClientPool()
@@ -3,17 +3,27 @@ Chat router for handling AI conversations with OpenAI API integration
 """
 
 import os
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import time
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 import openai
 
-from ..database import SessionLocal
+from ..database import AsyncSessionLocal
 from .. import deps, schemas
 from ..chat import crud
 from ..vector import vector_manager
-from ..security import decrypt_api_key, sanitize_input, SecurityConfig
+from ..mcp.tools import load_toolset, Toolset, ToolConfig
+from ..security import decrypt_api_key, sanitize_input, SecurityConfig, get_cached_api_key, cache_api_key
+from .providers import provider_pool
+from ..metrics import record_completion, record_provider_error, chat_streams_in_flight
+from ..timing import start_turn, span
+from .streaming import CompletionStream, format_sse
+from .pagination import encode_cursor, decode_cursors, NEXT_CURSOR_HEADER
+from .context import build_context_window, count_tokens, fit_to_tokens, ContextConfig, VECTOR_CONTEXT_PROMPT_TOKENS
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -22,9 +32,30 @@ limiter = Limiter(key_func=get_remote_address)
 
 router = APIRouter()
 
-def get_openai_client(api_key: str) -> openai.OpenAI:
-    """Get configured OpenAI client"""
-    return openai.OpenAI(api_key=api_key)
+def get_openai_client(api_key: str) -> openai.AsyncOpenAI:
+    """Get pooled async OpenAI client"""
+    return provider_pool.get_client(api_key)
+
+async def get_user_provider_key(db: AsyncSession, user_id: int, api_key_id: int) -> str:
+    """Get a user's decrypted provider key, served from the key cache when enabled"""
+    api_key = get_cached_api_key(api_key_id, user_id)
+    if api_key is not None:
+        return api_key
+
+    api_key_obj = await crud.get_user_api_key(db, user_id=user_id, api_key_id=api_key_id)
+    if not api_key_obj:
+        raise HTTPException(status_code=404, detail="API key not found")
+
+    # Decrypt API key using Fernet
+    try:
+        with span("decrypt_api_key"):
+            api_key = decrypt_api_key(api_key_obj.encrypted_key)
+    except Exception as e:
+        print(f"⚠️  SECURITY: Failed to decrypt API key for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to access API key")
+
+    cache_api_key(api_key_id, user_id, api_key)
+    return api_key
 
 def build_messages_for_openai(conversation_messages: List[schemas.Message]) -> List[Dict[str, str]]:
     """Convert database messages to OpenAI chat format"""
@@ -33,209 +64,340 @@ def build_messages_for_openai(conversation_messages: List[schemas.Message]) -> L
         for msg in conversation_messages
     ]
 
-def estimate_tokens(text: str) -> int:
-    """Rough token estimation (1 token ≈ 4 characters for English)"""
-    return len(text) // 4
+def estimate_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Token count for text using the model's tokenizer"""
+    return count_tokens(text, model)
+
+async def complete_with_tools(
+    client: openai.AsyncOpenAI,
+    model: str,
+    openai_messages: List[Dict[str, Any]],
+    toolset: Optional[Toolset]
+) -> Tuple[str, int, List[Dict[str, Any]]]:
+    """Run a completion, executing the model's tool calls until it answers.
+
+    All tool calls of one model response run concurrently, so each round
+    costs the slowest call rather than the sum. Returns the answer, the
+    total tokens used and a record of every tool call.
+    """
+    tool_calls_used = []
+    tokens_used = 0
+    for round_number in range(ToolConfig.MAX_ROUNDS + 1):
+        # The last round offers no tools so the model has to answer
+        offer_tools = bool(toolset) and round_number < ToolConfig.MAX_ROUNDS
+        started = time.perf_counter()
+        try:
+            with span("provider"):
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=openai_messages,
+                    stream=False,
+                    temperature=0.7,
+                    max_tokens=2048,
+                    **({"tools": toolset.openai_tools()} if offer_tools else {})
+                )
+        except Exception as e:
+            record_provider_error(model, e)
+            raise
+        record_completion(
+            model, started, time.perf_counter(),
+            response.usage.completion_tokens if response.usage else None, stream=False
+        )
+        tokens_used += response.usage.total_tokens if response.usage else 0
+        reply = response.choices[0].message
+        if not offer_tools or not reply.tool_calls:
+            return reply.content or "", tokens_used, tool_calls_used
+
+        openai_messages.append({
+            "role": "assistant",
+            "content": reply.content,
+            "tool_calls": [
+                {"id": call.id, "type": "function", "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in reply.tool_calls
+            ],
+        })
+        with span("tool_calls"):
+            records = await toolset.execute(reply.tool_calls)
+        for record in records:
+            openai_messages.append({"role": "tool", "tool_call_id": record["id"], "content": record.pop("output")})
+            tool_calls_used.append(record)
+    return "", tokens_used, tool_calls_used
+
+async def save_user_message(
+    db: AsyncSession,
+    user_id: int,
+    conversation_id: Optional[int],
+    title: str,
+    message: Dict[str, Any]
+):
+    """Persist a turn's user message on its own when no reply was produced"""
+    try:
+        await db.rollback()
+        await crud.append_turn(db, user_id=user_id, conversation_id=conversation_id, title=title, messages=[message])
+    except Exception as e:
+        print(f"✗ Failed to save user message: {e}")
 
 @router.post("/chat", response_model=schemas.ChatResponse)
 async def chat_completion(
     request: schemas.ChatRequest,
     background_tasks: BackgroundTasks,
+    response: Response,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Send a chat message and get AI response with security controls"""
-    try:
-        # Input sanitization
-        request.message = sanitize_input(request.message, 10000)  # Allow longer messages but limit
-
-        # Get and decrypt user's API key
-        api_key_obj = crud.get_user_api_key(db, user_id=current_user.id, api_key_id=request.api_key_id)
-        if not api_key_obj:
-            raise HTTPException(status_code=404, detail="API key not found")
-
-        # Decrypt API key using Fernet
+    with start_turn("chat") as timer:
+        completed = False
+        user_message = None
         try:
-            api_key = decrypt_api_key(api_key_obj.encrypted_key)
-        except Exception as e:
-            print(f"⚠️  SECURITY: Failed to decrypt API key for user {current_user.id}: {e}")
-            raise HTTPException(status_code=500, detail="Failed to access API key")
-
-        # Initialize OpenAI client
-        client = get_openai_client(api_key)
-
-        # Get or create conversation
-        if request.conversation_id:
-            conversation = crud.get_conversation(db, conversation_id=request.conversation_id, user_id=current_user.id)
-            if not conversation:
-                raise HTTPException(status_code=404, detail="Conversation not found")
-        else:
-            conversation = crud.create_conversation(db, title=f"Chat {len(request.message[:50])}...", user_id=current_user.id)
-
-        # Add user message to conversation
-        user_message = crud.create_message(
-            db,
-            conversation_id=conversation.id,
-            role="user",
-            content=request.message
-        )
-
-        # Get conversation history
-        messages = crud.get_conversation_messages(db, conversation_id=conversation.id)
-
-        # Build messages for OpenAI
-        openai_messages = build_messages_for_openai(messages)
+            # Input sanitization
+            request.message = sanitize_input(request.message, 10000)  # Allow longer messages but limit
+
+            # Get and decrypt user's API key
+            with span("api_key"):
+                api_key = await get_user_provider_key(db, user_id=current_user.id, api_key_id=request.api_key_id)
+
+            # Get pooled OpenAI client
+            client = get_openai_client(api_key)
+
+            # Get existing conversation (new conversations are created with the turn)
+            conversation_id = None
+            if request.conversation_id:
+                conversation = await crud.get_conversation(db, conversation_id=request.conversation_id, user_id=current_user.id)
+                if not conversation:
+                    raise HTTPException(status_code=404, detail="Conversation not found")
+                conversation_id = conversation.id
+
+            model = request.model or "gpt-3.5-turbo"
+            title = f"Chat {len(request.message[:50])}..."
+            user_message = {"role": "user", "content": request.message}
+            user_message_time = datetime.utcnow()
+
+            # Build messages for OpenAI from the newest history that fits the model's budget
+            use_vector_search = bool(request.use_vector_search) and conversation_id is not None
+            with span("context"):
+                openai_messages = await build_context_window(
+                    db,
+                    conversation_id=conversation_id,
+                    model=model,
+                    reserve_vector_context=use_vector_search,
+                    pending=[user_message]
+                )
 
-        # Add vector search results if enabled
-        if request.use_vector_search:
-            similar_docs = vector_manager.search_similar_messages(
-                query=request.message,
-                conversation_id=str(conversation.id)
+            # Add vector search results if enabled
+            if use_vector_search:
+                with span("vector_search"):
+                    similar_docs = await vector_manager.search_similar_messages(
+                        query=request.message,
+                        user_id=current_user.id,
+                        conversation_id=conversation_id,
+                        limit=3
+                    )
+                # Format similar messages as context
+                context = "\n\n".join([doc["content"] for doc in similar_docs[:3]])
+                if context:
+                    context = fit_to_tokens(context, ContextConfig.VECTOR_CONTEXT_TOKENS - VECTOR_CONTEXT_PROMPT_TOKENS, model)
+                    system_message = f"You have access to previous conversation context:\n{context}\n\nUse this to provide relevant responses."
+                    openai_messages.insert(0, {"role": "system", "content": system_message})
+
+            # Offer the tools of the user's active MCP servers
+            toolset = None
+            if request.mcp_tools_enabled:
+                with span("tool_catalog"):
+                    toolset = await load_toolset(db, current_user.id)
+
+            # Make OpenAI API call(s), running requested tools between rounds
+            ai_response, tokens_used, tool_calls = await complete_with_tools(client, model, openai_messages, toolset)
+
+            # Save the whole turn in one transaction
+            conversation_id, (_, ai_message) = await crud.append_turn(
+                db,
+                user_id=current_user.id,
+                conversation_id=conversation_id,
+                title=title,
+                messages=[
+                    {**user_message, "created_at": user_message_time},
+                    {
+                        "role": "assistant",
+                        "content": ai_response,
+                        "model": model,
+                        "tokens_used": tokens_used,
+                        "tool_calls": {"calls": tool_calls} if tool_calls else None,
+                    },
+                ]
             )
-            # Format similar messages as context
-            context = "\n\n".join([doc["content"] for doc in similar_docs[:3]])
-            if context:
-                system_message = f"You have access to previous conversation context:\n{context}\n\nUse this to provide relevant responses."
-                openai_messages.insert(0, {"role": "system", "content": system_message})
-
-        # Make OpenAI API call
-        response = client.chat.completions.create(
-            model=request.model or "gpt-3.5-turbo",
-            messages=openai_messages,
-            stream=False,  # Use non-streaming for now, can add streaming later
-            temperature=0.7,
-            max_tokens=2048
-        )
 
-        # Extract response
-        ai_response = response.choices[0].message.content
-        tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else 0
-
-        # Save AI response
-        ai_message = crud.create_message(
-            db,
-            conversation_id=conversation.id,
-            role="assistant",
-            content=ai_response,
-            model=request.model or "gpt-3.5-turbo",
-            tokens_used=tokens_used
-        )
-
-        # Update conversation metadata
-        crud.update_conversation_message_count(db, conversation_id=conversation.id)
-
-        return schemas.ChatResponse(
-            message=ai_message,
-            conversation_id=conversation.id,
-            tool_calls_used=None  # TODO: Add MCP tool calling
-        )
+            completed = True
+            timer.set_header(response.headers)
+            return schemas.ChatResponse(
+                message=ai_message,
+                conversation_id=conversation_id,
+                tool_calls_used=tool_calls or None
+            )
 
-    except openai.AuthenticationError:
-        raise HTTPException(status_code=401, detail="Invalid API key")
-    except openai.RateLimitError:
-        raise HTTPException(status_code=429, detail="OpenAI rate limit exceeded")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+        except openai.AuthenticationError:
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        except openai.RateLimitError:
+            raise HTTPException(status_code=429, detail="OpenAI rate limit exceeded")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+        finally:
+            if user_message is not None and not completed:
+                # The user's message is kept even when the turn failed
+                await save_user_message(
+                    db, current_user.id, conversation_id, title, {**user_message, "created_at": user_message_time}
+                )
+            timer.log(user_id=current_user.id, model=request.model, ok=completed)
 
 @router.post("/chat/stream")
 async def chat_completion_stream(
     request: schemas.ChatRequest,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Streaming chat completion endpoint with security"""
-    try:
-        # Input sanitization
-        request.message = sanitize_input(request.message, 10000)
-
-        # Get and decrypt API key
-        api_key_obj = crud.get_user_api_key(db, user_id=current_user.id, api_key_id=request.api_key_id)
-        if not api_key_obj:
-            raise HTTPException(status_code=404, detail="API key not found")
-
-        # Decrypt API key using Fernet
+    # Pre-stream phases go in the header; the whole turn is logged after persisting
+    timer = start_turn("chat_stream")
+    with timer:
         try:
-            api_key = decrypt_api_key(api_key_obj.encrypted_key)
-        except Exception as e:
-            print(f"⚠️  SECURITY: Failed to decrypt API key for user {current_user.id}: {e}")
-            raise HTTPException(status_code=500, detail="Failed to access API key")+++++++ REPLACE
-        client = get_openai_client(api_key)
-
-        # Get conversation
-        if request.conversation_id:
-            conversation = crud.get_conversation(db, conversation_id=request.conversation_id, user_id=current_user.id)
-        else:
-            conversation = crud.create_conversation(db, title=f"Chat {len(request.message[:50])}...", user_id=current_user.id)
-
-        # Add user message
-        crud.create_message(db, conversation_id=conversation.id, role="user", content=request.message)
-
-        # Get history and build messages
-        messages = crud.get_conversation_messages(db, conversation_id=conversation.id)
-        openai_messages = build_messages_for_openai(messages)
-
-        async def generate():
-            """Streaming response generator"""
-            try:
-                stream = client.chat.completions.create(
-                    model=request.model or "gpt-3.5-turbo",
-                    messages=openai_messages,
-                    stream=True,
-                    temperature=0.7,
-                    max_tokens=2048
-                )
-
-                full_response = ""
-                for chunk in stream:
-                    if chunk.choices[0].delta.content:
-                        content = chunk.choices[0].delta.content
-                        full_response += content
-                        yield f"data: {content}\n\n"
-
-                # Save the complete response
-                ai_message = crud.create_message(
+            # Input sanitization
+            request.message = sanitize_input(request.message, 10000)
+
+            # Get and decrypt API key
+            with span("api_key"):
+                api_key = await get_user_provider_key(db, user_id=current_user.id, api_key_id=request.api_key_id)
+
+            client = get_openai_client(api_key)
+
+            # Get conversation
+            if request.conversation_id:
+                conversation = await crud.get_conversation(db, conversation_id=request.conversation_id, user_id=current_user.id)
+                if not conversation:
+                    raise HTTPException(status_code=404, detail="Conversation not found")
+                history_conversation_id = conversation.id
+            else:
+                # Create up front so the client can find the conversation once the stream ends
+                conversation = await crud.create_conversation(db, title=f"Chat {len(request.message[:50])}...", user_id=current_user.id)
+                history_conversation_id = None
+            conversation_id = conversation.id
+
+            # Build messages from the newest history that fits the model's budget
+            model = request.model or "gpt-3.5-turbo"
+            user_message = {"role": "user", "content": request.message}
+            user_message_time = datetime.utcnow()
+            with span("context"):
+                openai_messages = await build_context_window(
                     db,
-                    conversation_id=conversation.id,
-                    role="assistant",
-                    content=full_response,
-                    model=request.model or "gpt-3.5-turbo"
+                    conversation_id=history_conversation_id,
+                    model=model,
+                    pending=[user_message]
                 )
-                crud.update_conversation_message_count(db, conversation_id=conversation.id)
 
-                yield f"data: [DONE]\n\n"
-
-            except Exception as e:
-                yield f"data: Error: {str(e)}\n\n"
-
-        return StreamingResponse(
-            generate(),
-            media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
-        )
+            # Release the request's DB connection before the long-lived stream starts
+            await db.close()
+            completion = None
+
+            async def generate():
+                """Streaming response generator"""
+                nonlocal completion
+                started = time.perf_counter()
+                chat_streams_in_flight.inc()
+                try:
+                    stream = await client.chat.completions.create(
+                        model=model,
+                        messages=openai_messages,
+                        stream=True,
+                        temperature=0.7,
+                        max_tokens=2048
+                    )
+
+                    completion = CompletionStream(stream)
+                    async for frame in completion.frames():
+                        yield frame
+
+                    yield format_sse("[DONE]")
+                    # Streams carry no usage; each content delta is about one token
+                    record_completion(
+                        model, started, completion.finished_at, len(completion.parts),
+                        stream=True, first_token_at=completion.first_content_at
+                    )
+                    if completion.first_content_at is not None:
+                        timer.add("provider_first_token", completion.first_content_at - started)
+                    timer.add("provider", completion.finished_at - started)
+
+                except Exception as e:
+                    record_provider_error(model, e)
+                    yield format_sse(f"Error: {str(e)}")
+                finally:
+                    chat_streams_in_flight.dec()
+
+            async def persist_response():
+                """Save the streamed response with a dedicated session, then log the turn's timing"""
+                try:
+                    # The user's message is kept even when the stream failed or came back empty
+                    messages = [{**user_message, "created_at": user_message_time}]
+                    if completion is not None and completion.parts:
+                        messages.append({"role": "assistant", "content": completion.text, "model": model})
+                    # Lets the CRUD layer's spans find this turn's timer again
+                    with timer:
+                        async with AsyncSessionLocal() as persist_db:
+                            await crud.append_turn(
+                                persist_db,
+                                user_id=current_user.id,
+                                conversation_id=conversation_id,
+                                messages=messages
+                            )
+                finally:
+                    timer.log(user_id=current_user.id, model=model, ok=completion is not None and completion.completed)
+
+            headers = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+            timer.set_header(headers)
+            return StreamingResponse(
+                generate(),
+                media_type="text/event-stream",
+                background=BackgroundTask(persist_response),
+                headers=headers
+            )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Streaming error: {str(e)}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Streaming error: {str(e)}")
 
 # Conversation management endpoints
 @router.get("/conversations", response_model=List[schemas.Conversation])
 async def get_conversations(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
-    """Get user's conversations"""
-    conversations = crud.get_user_conversations(db, user_id=current_user.id, skip=skip, limit=limit)
+    """Get user's conversations (offset or cursor paginated)"""
+    before_position, after_position = decode_cursors(before, after)
+    conversations = await crud.get_user_conversations(
+        db,
+        user_id=current_user.id,
+        skip=skip,
+        limit=limit,
+        before=before_position,
+        after=after_position
+    )
+
+    # Cursor continues in the requested direction (older by default)
+    if conversations and len(conversations) == limit:
+        edge = conversations[0] if after_position else conversations[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(edge.updated_at, edge.id)
     return conversations
 
 @router.get("/conversations/{conversation_id}", response_model=schemas.Conversation)
 async def get_conversation(
     conversation_id: int,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Get specific conversation"""
-    conversation = crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
+    conversation = await crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
@@ -244,17 +406,33 @@ async def get_conversation(
 @router.get("/conversations/{conversation_id}/messages", response_model=List[schemas.Message])
 async def get_conversation_messages(
     conversation_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
-    """Get messages for a conversation"""
-    conversation = crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
+    """Get messages for a conversation (offset or cursor paginated)"""
+    before_position, after_position = decode_cursors(before, after)
+    conversation = await crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    messages = crud.get_conversation_messages(db, conversation_id=conversation_id, skip=skip, limit=limit)
+    messages = await crud.get_conversation_messages(
+        db,
+        conversation_id=conversation_id,
+        skip=skip,
+        limit=limit,
+        before=before_position,
+        after=after_position
+    )
+
+    # Cursor continues in the requested direction (newer by default)
+    if messages and len(messages) == limit:
+        edge = messages[0] if before_position else messages[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(edge.created_at, edge.id)
     return messages
 
 @router.put("/conversations/{conversation_id}", response_model=schemas.Conversation)
@@ -262,26 +440,51 @@ async def update_conversation(
     conversation_id: int,
     conversation_update: schemas.ConversationUpdate,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Update conversation title"""
-    conversation = crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
+    conversation = await crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    updated = crud.update_conversation(db, conversation_id=conversation_id, updates=conversation_update)
+    updated = await crud.update_conversation(db, conversation_id=conversation_id, updates=conversation_update)
     return updated
 
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(
     conversation_id: int,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Delete a conversation"""
-    conversation = crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
+    conversation = await crud.get_conversation(db, conversation_id=conversation_id, user_id=current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    crud.delete_conversation(db, conversation_id=conversation_id)
+    await crud.delete_conversation(db, conversation_id=conversation_id)
     return {"message": "Conversation deleted successfully"}
+
+@router.post("/search", response_model=schemas.VectorSearchResponse)
+async def search_messages(
+    request: schemas.VectorSearchRequest,
+    current_user: schemas.User = Depends(deps.get_current_active_user)
+):
+    """Search the user's messages by similarity (collection_id scopes to a conversation)"""
+    conversation_id = None
+    if request.collection_id:
+        try:
+            conversation_id = int(request.collection_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="collection_id must be a conversation ID")
+
+    results = await vector_manager.search_similar_messages(
+        query=request.query,
+        user_id=current_user.id,
+        conversation_id=conversation_id,
+        limit=request.limit or 5,
+        threshold=request.threshold if request.threshold is not None else 0.0
+    )
+    return schemas.VectorSearchResponse(
+        results=[schemas.VectorSearchResult(**result) for result in results],
+        total_found=len(results)
+    )
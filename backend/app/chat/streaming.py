@@ -0,0 +1,110 @@
+"""
+Server-sent events streaming engine for chat completions
+"""
+
+import os
+import time
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+# Streaming configuration
+class StreamConfig:
+    # Coalesce upstream deltas until this many bytes are pending...
+    FLUSH_BYTES = int(os.getenv("STREAM_FLUSH_BYTES", "256"))
+    # ...or this much time has passed since the last frame was sent
+    FLUSH_INTERVAL_SECONDS = float(os.getenv("STREAM_FLUSH_INTERVAL_MS", "50")) / 1000
+
+def format_sse(data: str, event: Optional[str] = None) -> str:
+    """Format a payload as a single SSE frame (multi-line safe)"""
+    frame = "".join(f"data: {line}\n" for line in data.split("\n"))
+    if event:
+        frame = f"event: {event}\n{frame}"
+    return frame + "\n"
+
+class CompletionStream:
+    """Turns an async provider stream into coalesced SSE frames.
+
+    Deltas are accumulated in a list and joined once at the end. Frames are
+    only produced when the consumer asks for the next one and at most one
+    chunk is read ahead, so a slow client naturally slows down reads from
+    the upstream connection.
+    """
+
+    def __init__(
+        self,
+        upstream: AsyncIterator,
+        flush_bytes: int = StreamConfig.FLUSH_BYTES,
+        flush_interval: float = StreamConfig.FLUSH_INTERVAL_SECONDS,
+    ):
+        self.upstream = upstream
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.parts: List[str] = []
+        self.completed = False
+        # perf_counter() at the first content delta and at the end of the stream
+        self.first_content_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        """Full response text received so far"""
+        return "".join(self.parts)
+
+    async def frames(self) -> AsyncIterator[str]:
+        """Yield SSE frames, flushing by size or elapsed time.
+
+        Buffered text is flushed once the interval passes even while the
+        upstream is stalled (slow first token, tool-call generation).
+        """
+        pending: List[str] = []
+        pending_bytes = 0
+        last_flush = time.monotonic()
+        chunks = self.upstream.__aiter__()
+        next_chunk: Optional[asyncio.Future] = None
+
+        try:
+            while True:
+                if next_chunk is None:
+                    next_chunk = asyncio.ensure_future(chunks.__anext__())
+                if pending:
+                    remaining = self.flush_interval - (time.monotonic() - last_flush)
+                    done, _ = await asyncio.wait({next_chunk}, timeout=max(remaining, 0))
+                    if not done:
+                        yield format_sse("".join(pending))
+                        pending.clear()
+                        pending_bytes = 0
+                        last_flush = time.monotonic()
+                        continue
+                try:
+                    chunk = await next_chunk
+                except StopAsyncIteration:
+                    break
+                finally:
+                    next_chunk = None
+
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+
+                if self.first_content_at is None:
+                    self.first_content_at = time.perf_counter()
+                self.parts.append(content)
+                pending.append(content)
+                pending_bytes += len(content.encode())
+
+                now = time.monotonic()
+                if pending_bytes >= self.flush_bytes or now - last_flush >= self.flush_interval:
+                    yield format_sse("".join(pending))
+                    pending.clear()
+                    pending_bytes = 0
+                    last_flush = now
+        finally:
+            if next_chunk is not None:
+                next_chunk.cancel()
+
+        self.finished_at = time.perf_counter()
+        if pending:
+            yield format_sse("".join(pending))
+        self.completed = True
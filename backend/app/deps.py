@@ -2,13 +2,17 @@
 Dependencies for FastAPI application
 """
 
-from typing import Generator
+import time
+import hashlib
+import threading
+from typing import AsyncGenerator, Dict, Set
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
-from .database import SessionLocal
+from .database import AsyncSessionLocal
 from . import schemas
+from .cache import TTLCache
 from .security import SecurityConfig
 
 # OAuth2 scheme for token authentication
@@ -19,15 +23,65 @@ SECRET_KEY = SecurityConfig.SECRET_KEY
 ALGORITHM = SecurityConfig.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = SecurityConfig.ACCESS_TOKEN_EXPIRE_MINUTES
 
-def get_db() -> Generator[Session, None, None]:
-    """Database session dependency"""
-    db = SessionLocal()
-    try:
+class PrincipalCache:
+    """Caches authenticated users by token so cache hits skip the database.
+
+    Entries live for at most PRINCIPAL_CACHE_TTL_SECONDS (and never past the
+    token's own expiry). Writers call ``invalidate_user`` so changes made in
+    this process are seen immediately; other workers pick them up once the
+    TTL lapses.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        """Get the cached user for a token"""
+        if not self._cache.enabled:
+            return None
+        return self._cache.get(self._key(token))
+
+    def set(self, token: str, user: schemas.User, expires_at: float = None):
+        """Cache a user for a token until the TTL or token expiry"""
+        if not self._cache.enabled:
+            return
+        ttl = None if expires_at is None else expires_at - time.time()
+        key = self._key(token)
+        self._cache.set(key, user, ttl_seconds=ttl)
+        with self._lock:
+            keys = self._tokens_by_user.setdefault(user.id, set())
+            # Forget tokens that have already expired or been evicted
+            keys.intersection_update([k for k in keys if k in self._cache])
+            keys.add(key)
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token for a user"""
+        with self._lock:
+            keys = self._tokens_by_user.pop(user_id, set())
+        for key in keys:
+            self._cache.pop(key)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+# Global principal cache
+principal_cache = PrincipalCache(
+    max_entries=SecurityConfig.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=SecurityConfig.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async database session dependency"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     """Get current authenticated user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -35,6 +89,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    # Cached principals were validated when cached and expire with the token
+    cached_user = principal_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -46,11 +105,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
 
     from .users import crud  # Import here to avoid circular imports
-    user = crud.get_user_by_username(db, username=token_data.username)
+    user = await crud.get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
 
-    return user
+    principal = schemas.User.model_validate(user)
+    principal_cache.set(token, principal, expires_at=payload.get("exp"))
+    return principal
 
 def get_current_active_user(current_user = Depends(get_current_user)):
     """Get current active user"""
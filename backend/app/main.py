@@ -4,18 +4,17 @@ FastAPI application for AI chat with MCP server integration and vector storage
 """
 
 import os
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 import structlog
-import chromadb
-import weaviate
-import pinecone
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -47,51 +46,46 @@ from .chat import router as chat_router
 from .mcp import router as mcp_router
 from .users import router as users_router
 from .vector import vector_manager
-
-# Vector database clients
-chroma_client = None
-weaviate_client = None
-pinecone_client = None
+from .vector.backends import backends
+from .chat.providers import provider_pool
+from .chat.context import warm_up_encodings
+from .mcp.connections import mcp_connections
+from .mcp.usage import usage_aggregator
+from .mcp.catalog import tool_catalog
+from .auth.hashing import password_hasher, HasherSaturatedError
+from .database import async_engine, pool_wait_observers
+from .metrics import MetricsConfig, MetricsMiddleware, instrument_database, rate_limit_rejections, render_metrics, METRICS_CONTENT_TYPE
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan context manager"""
     # Initialize on startup
-    global chroma_client, weaviate_client, pinecone_client
-
-    # Initialize ChromaDB (local)
-    try:
-        chroma_client = chromadb.PersistentClient(path="./data/chroma")
-        print("✓ ChromaDB initialized")
-    except Exception as e:
-        print(f"✗ ChromaDB initialization failed: {e}")
-
-    # Initialize Weaviate (optional)
-    weaviate_url = os.getenv("WEAVIATE_URL")
-    if weaviate_url:
-        try:
-            weaviate_client = weaviate.Client(url=weaviate_url)
-            print("✓ Weaviate initialized")
-        except Exception as e:
-            print(f"✗ Weaviate initialization failed: {e}")
-
-    # Initialize Pinecone (optional)
-    pinecone_api_key = os.getenv("PINECONE_API_KEY")
-    if pinecone_api_key:
-        try:
-            pinecone.init(api_key=pinecone_api_key)
-            pinecone_client = pinecone
-            print("✓ Pinecone initialized")
-        except Exception as e:
-            print(f"✗ Pinecone initialization failed: {e}")
-
-    # Initialize vector manager with clients
-    vector_manager.initialize(chroma_client, weaviate_client, pinecone_client)
+    # Vector backends connect on first use; warm them up without delaying startup
+    vector_manager.initialize()
+    vector_manager.start()
+    warm_up = asyncio.create_task(vector_manager.warm_up())
+    # tiktoken may download its BPE files; keep that off the request path
+    encodings_warm_up = asyncio.create_task(warm_up_encodings())
+    # Connect MCP servers in the background and keep their sessions warm
+    mcp_connections.start()
+    usage_aggregator.start()
+
+    # Tune bcrypt cost to this host (no-op unless BCRYPT_TARGET_MS is set)
+    await password_hasher.calibrate()
 
     yield
 
     # Cleanup on shutdown
     print("Shutting down AI Chat MCP Studio...")
+    warm_up.cancel()
+    encodings_warm_up.cancel()
+    await vector_manager.stop()
+    await mcp_connections.close()
+    # Write buffered tool usage before the database pool closes
+    await usage_aggregator.stop()
+    await provider_pool.close()
+    await async_engine.dispose()
+    password_hasher.shutdown()
 
 # Rate limiting
 
@@ -119,14 +113,43 @@ app.add_middleware(
         "Access-Control-Request-Method",
         "Access-Control-Request-Headers"
     ],
+    expose_headers=["X-Next-Cursor"],
     max_age=86400,  # 24 hours
 )
 
 # Rate limiter setup (moved here after app creation)
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+def _route_path(request: Request) -> str:
+    """Route template of a request (SlowAPIMiddleware rejects before routing)"""
+    route = request.scope.get("route")
+    if route is None:
+        route = next((r for r in request.app.routes if r.matches(request.scope)[0] == Match.FULL), None)
+    return getattr(route, "path", None) or "unmatched"
+
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Count the rejection, then respond as slowapi does"""
+    if MetricsConfig.ENABLED:
+        rate_limit_rejections.labels(_route_path(request)).inc()
+    return _rate_limit_exceeded_handler(request, exc)
+
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 
+# Metrics wrap everything else so latency includes all middleware
+if MetricsConfig.ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_database(async_engine, pool_wait_observers)
+
+# Password hashing saturation - fail fast instead of queueing without bound
+@app.exception_handler(HasherSaturatedError)
+async def hasher_saturated_handler(request: Request, exc: HasherSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -141,13 +164,24 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "vector_db": {
-            "chroma": chroma_client is not None,
-            "weaviate": weaviate_client is not None,
-            "pinecone": pinecone_client is not None,
-        }
+        "vector_db": {name: backend.loaded for name, backend in backends.items()},
+        "vector_pipeline": vector_manager.stats(),
+        "mcp": mcp_connections.stats(),
+        "mcp_usage": usage_aggregator.stats(),
+        "mcp_tool_catalog": tool_catalog.stats(),
+        "password_hashing": password_hasher.stats(),
     }
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Metrics in the Prometheus text format"""
+    if not MetricsConfig.ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if MetricsConfig.TOKEN and request.headers.get("authorization") != f"Bearer {MetricsConfig.TOKEN}":
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Include routers
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(chat_router, prefix="/api/chat", tags=["Chat"])
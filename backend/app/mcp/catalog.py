@@ -0,0 +1,162 @@
+"""
+Per-server MCP tool catalogs
+Tool lists are cached with a TTL and served stale while a background
+refresh runs, so building a turn's tools payload needs no server round
+trip. Entries are invalidated on server updates and on list_changed
+notifications.
+"""
+
+import os
+import json
+import time
+import asyncio
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional
+
+from ..cache import TTLCache
+from .connections import mcp_connections, ServerEndpoint
+
+# Tool catalog configuration
+class CatalogConfig:
+    TTL_SECONDS = float(os.getenv("MCP_TOOL_CATALOG_TTL_SECONDS", "300"))
+    # Entries up to this old are still served while a refresh runs in the background
+    MAX_STALE_SECONDS = float(os.getenv("MCP_TOOL_CATALOG_MAX_STALE_SECONDS", "3600"))
+    REFRESH_TIMEOUT_SECONDS = float(os.getenv("MCP_TOOL_LIST_TIMEOUT_SECONDS", "3"))
+    # Pre-serialized per-user tool payloads
+    PAYLOAD_MAX_USERS = int(os.getenv("MCP_TOOL_PAYLOAD_CACHE_USERS", "1000"))
+
+LIST_CHANGED = "notifications/tools/list_changed"
+
+class CatalogEntry(NamedTuple):
+    """One server's tool list as last fetched"""
+    endpoint: ServerEndpoint
+    tools: List[Dict[str, Any]]
+    # Changes only when the tool list itself changes
+    version: int
+    fetched_at: float
+    stale: bool = False
+
+class ToolCatalog:
+    """Caches each MCP server's tool list"""
+
+    def __init__(self):
+        self._entries: Dict[int, CatalogEntry] = {}
+        self._refreshing: Dict[int, asyncio.Task] = {}
+        # Bumped on invalidation so in-flight refreshes of old settings are discarded
+        self._generations: Dict[int, int] = {}
+        self._versions = 0
+        # Built payloads keyed by (user_id, catalog signature)
+        self.payloads = TTLCache(CatalogConfig.PAYLOAD_MAX_USERS, CatalogConfig.MAX_STALE_SECONDS)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.unchanged_refreshes = 0
+        self.refresh_failures = 0
+        self.notifications = 0
+
+    async def _fetch(self, endpoint: ServerEndpoint) -> CatalogEntry:
+        generation = self._generations.get(endpoint.id, 0)
+        tools = await asyncio.wait_for(mcp_connections.list_tools(endpoint), CatalogConfig.REFRESH_TIMEOUT_SECONDS)
+        self.refreshes += 1
+
+        previous = self._entries.get(endpoint.id)
+        if previous is not None and previous.endpoint.fingerprint == endpoint.fingerprint and previous.tools == tools:
+            # Same tools: keep the version so built payloads stay valid
+            self.unchanged_refreshes += 1
+            entry = previous._replace(endpoint=endpoint, fetched_at=time.monotonic(), stale=False)
+        else:
+            self._versions += 1
+            entry = CatalogEntry(endpoint, tools, self._versions, time.monotonic())
+        if self._generations.get(endpoint.id, 0) == generation:
+            self._entries[endpoint.id] = entry
+        return entry
+
+    def _refresh(self, endpoint: ServerEndpoint) -> asyncio.Task:
+        """Start a refresh unless one is already running for the server"""
+        task = self._refreshing.get(endpoint.id)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch(endpoint))
+            self._refreshing[endpoint.id] = task
+            task.add_done_callback(lambda done: self._refresh_done(endpoint.id, done))
+        return task
+
+    def _refresh_done(self, server_id: int, task: asyncio.Task):
+        if self._refreshing.get(server_id) is task:
+            del self._refreshing[server_id]
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_failures += 1
+            error = task.exception()
+            print(f"⚠️  MCP server {server_id} tool list refresh failed: {str(error) or type(error).__name__}")
+
+    async def get(self, endpoint: ServerEndpoint) -> Optional[CatalogEntry]:
+        """Get a server's tools, fetching only on a miss (None if unavailable)"""
+        entry = self._entries.get(endpoint.id)
+        if entry is not None and entry.endpoint.fingerprint == endpoint.fingerprint:
+            age = time.monotonic() - entry.fetched_at
+            if age < CatalogConfig.TTL_SECONDS and not entry.stale:
+                self.hits += 1
+                return entry
+            if age < CatalogConfig.MAX_STALE_SECONDS:
+                self.stale_hits += 1
+                self._refresh(endpoint)
+                return entry
+        else:
+            entry = None
+
+        self.misses += 1
+        task = self._refresh(endpoint)
+        try:
+            # Shielded so a cancelled caller does not cancel the shared fetch
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                # Invalidated while fetching
+                return None
+            raise
+        except Exception:
+            return entry
+
+    def invalidate(self, server_id: int):
+        """Forget a server's tools (after its settings change or it is deleted)"""
+        self._generations[server_id] = self._generations.get(server_id, 0) + 1
+        self._entries.pop(server_id, None)
+        task = self._refreshing.pop(server_id, None)
+        if task is not None:
+            task.cancel()
+
+    def on_notification(self, server_id: int, message: Dict[str, Any]):
+        """Refresh a server's tools when it reports that they changed"""
+        if message.get("method") != LIST_CHANGED:
+            return
+        self.notifications += 1
+        entry = self._entries.get(server_id)
+        if entry is not None:
+            self._entries[server_id] = entry._replace(stale=True)
+            self._refresh(entry.endpoint)
+
+    @staticmethod
+    def signature(entries: List[CatalogEntry]) -> Hashable:
+        """Identifies a combination of catalog versions"""
+        return tuple(sorted((entry.endpoint.id, entry.version) for entry in entries))
+
+    def stats(self) -> dict:
+        """Get catalog statistics"""
+        return {
+            "servers": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "unchanged_refreshes": self.unchanged_refreshes,
+            "refresh_failures": self.refresh_failures,
+            "notifications": self.notifications,
+            "payloads": self.payloads.stats(),
+        }
+
+def serialize_tools(tools: List[Dict[str, Any]]) -> bytes:
+    """Compact, stable JSON for a tools payload"""
+    return json.dumps(tools, separators=(",", ":"), sort_keys=True).encode()
+
+# Global instance
+tool_catalog = ToolCatalog()
+mcp_connections.add_notification_listener(tool_catalog.on_notification)
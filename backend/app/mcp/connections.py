@@ -0,0 +1,629 @@
+"""
+Persistent MCP server sessions
+Keeps one initialized JSON-RPC session per server warm and reuses it for
+every tool call: pooled HTTP keep-alive, long-lived websockets and
+supervised stdio subprocesses
+"""
+
+import os
+import re
+import json
+import time
+import shlex
+import socket
+import asyncio
+import hashlib
+import ipaddress
+import itertools
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+# MCP connection configuration
+class MCPConfig:
+    PROTOCOL_VERSION = "2024-11-05"
+    CLIENT_INFO = {"name": "gideon", "version": "1.0.0"}
+    CONNECT_TIMEOUT_SECONDS = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))
+    REQUEST_TIMEOUT_SECONDS = float(os.getenv("MCP_REQUEST_TIMEOUT", "30"))
+    # Shared keep-alive pool for HTTP servers
+    HTTP_MAX_CONNECTIONS = int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "200"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MCP_HTTP_MAX_KEEPALIVE_CONNECTIONS", "50"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("MCP_HTTP_KEEPALIVE_EXPIRY", "60"))
+    # Health prober
+    HEALTH_INTERVAL_SECONDS = float(os.getenv("MCP_HEALTH_INTERVAL_SECONDS", "30"))
+    HEALTH_CONCURRENCY = int(os.getenv("MCP_HEALTH_CONCURRENCY", "16"))
+    # Reconnect backoff after a failed connection
+    RECONNECT_BACKOFF_SECONDS = float(os.getenv("MCP_RECONNECT_BACKOFF_SECONDS", "1"))
+    RECONNECT_BACKOFF_MAX_SECONDS = float(os.getenv("MCP_RECONNECT_BACKOFF_MAX_SECONDS", "60"))
+    # stdio servers run commands on this host, so only these exact command lines may start
+    # (";"-separated, defined by the operator; arguments must match too)
+    STDIO_ALLOWED_COMMANDS = [shlex.split(c) for c in os.getenv("MCP_STDIO_ALLOWED_COMMANDS", "").split(";") if c.strip()]
+    # Variables stdio servers inherit from this process; nothing else (secrets, DATABASE_URL) is passed on
+    STDIO_INHERITED_ENV = ("PATH", "HOME", "LANG", "LC_ALL", "TZ")
+    # Per-server env variables users may set (empty allows any name that is not blocked)
+    STDIO_ALLOWED_ENV = [v.strip() for v in os.getenv("MCP_STDIO_ALLOWED_ENV", "").split(",") if v.strip()]
+    MAX_MESSAGE_BYTES = int(os.getenv("MCP_MAX_MESSAGE_BYTES", str(16 * 1024 * 1024)))
+    # HTTP and websocket servers must resolve to public addresses unless this is set (local development)
+    ALLOW_PRIVATE_NETWORKS = os.getenv("MCP_ALLOW_PRIVATE_NETWORKS", "false").lower() == "true"
+
+CONNECTION_TYPES = ("http", "websocket", "stdio")
+
+# Loader, interpreter and package-manager hooks that would let a server's env run other code
+_BLOCKED_ENV_NAMES = {
+    "PATH", "HOME", "BASH_ENV", "ENV", "NODE_OPTIONS", "NODE_PATH", "PERL5OPT", "PERL5LIB", "PERLLIB",
+    "RUBYOPT", "RUBYLIB", "JAVA_TOOL_OPTIONS", "_JAVA_OPTIONS", "JDK_JAVA_OPTIONS", "GCONV_PATH",
+}
+_BLOCKED_ENV_PREFIXES = ("LD_", "DYLD_", "PYTHON", "NPM_CONFIG_", "UV_", "PIP_")
+_ENV_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def stdio_command_allowed(command: str) -> bool:
+    """Whether a stdio server's command line is one the operator allowed"""
+    try:
+        return shlex.split(command) in MCPConfig.STDIO_ALLOWED_COMMANDS
+    except ValueError:
+        return False
+
+def stdio_env_error(env: Any) -> Optional[str]:
+    """Why a stdio server's env variables are rejected (None if they are acceptable)"""
+    if not isinstance(env, dict):
+        return "env must be an object"
+    for name in env:
+        name = str(name)
+        upper = name.upper()
+        if not _ENV_NAME_RE.match(name):
+            return f"Invalid environment variable name: {name}"
+        if upper in _BLOCKED_ENV_NAMES or upper.startswith(_BLOCKED_ENV_PREFIXES):
+            return f"Environment variable {name} is not allowed"
+        if MCPConfig.STDIO_ALLOWED_ENV and name not in MCPConfig.STDIO_ALLOWED_ENV:
+            return f"Environment variable {name} is not allowed (see MCP_STDIO_ALLOWED_ENV)"
+    return None
+
+class MCPError(Exception):
+    """Raised when an MCP server cannot be reached or returns an error"""
+
+def is_public_address(address: str) -> bool:
+    """Whether an IP address is globally routable (not loopback, private, link-local or reserved)"""
+    try:
+        ip = ipaddress.ip_address(address.split("%")[0])
+    except ValueError:
+        return False
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+def _check_peer(host: str, address: Optional[str]):
+    if address is not None and not MCPConfig.ALLOW_PRIVATE_NETWORKS and not is_public_address(address):
+        raise MCPError(f"MCP server host {host} resolves to a non-public address")
+
+async def check_public_url(url: str):
+    """Raise MCPError unless every address the URL's host resolves to is public"""
+    if MCPConfig.ALLOW_PRIVATE_NETWORKS:
+        return
+    try:
+        parsed = urlparse(url)
+        host = parsed.hostname
+        port = parsed.port or (443 if parsed.scheme in ("https", "wss") else 80)
+    except ValueError:
+        raise MCPError("Invalid MCP server URL")
+    if not host:
+        raise MCPError("MCP server URL has no host")
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise MCPError(f"Could not resolve MCP server host {host}: {e}")
+    for *_, sockaddr in addresses:
+        _check_peer(host, sockaddr[0])
+
+class ServerEndpoint(NamedTuple):
+    """Connection details of an MCP server, detached from the ORM row"""
+    id: int
+    url: str
+    connection_type: str
+    configuration: Dict[str, Any]
+
+    @classmethod
+    def from_model(cls, server) -> "ServerEndpoint":
+        return cls(server.id, server.url, server.connection_type or "http", dict(server.configuration or {}))
+
+    @property
+    def fingerprint(self) -> str:
+        raw = json.dumps([self.url, self.connection_type, self.configuration], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+class MCPSession:
+    """An initialized JSON-RPC session with one MCP server"""
+
+    def __init__(self, endpoint: ServerEndpoint):
+        self.endpoint = endpoint
+        self.server_info: Dict[str, Any] = {}
+        self.connected_at: Optional[float] = None
+        self.last_used = time.monotonic()
+        self._ids = itertools.count(1)
+        # Called with (server_id, message) for notifications the server pushes
+        self.on_notification: Optional[Callable[[int, Dict[str, Any]], None]] = None
+
+    def _notify(self, message: Dict[str, Any]):
+        if self.on_notification is not None:
+            self.on_notification(self.endpoint.id, message)
+
+    @property
+    def connected(self) -> bool:
+        return self.connected_at is not None
+
+    async def _open(self):
+        raise NotImplementedError
+
+    async def _send(self, message: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        """Send a message; return the response for requests, None for notifications"""
+        raise NotImplementedError
+
+    async def close(self):
+        self.connected_at = None
+
+    async def connect(self):
+        """Open the transport and run the MCP initialize handshake"""
+        await asyncio.wait_for(self._open(), MCPConfig.CONNECT_TIMEOUT_SECONDS)
+        result = await self._request("initialize", {
+            "protocolVersion": MCPConfig.PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": MCPConfig.CLIENT_INFO,
+        }, MCPConfig.CONNECT_TIMEOUT_SECONDS)
+        self.server_info = result or {}
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized"}, MCPConfig.CONNECT_TIMEOUT_SECONDS)
+        self.connected_at = time.monotonic()
+
+    async def _request(self, method: str, params: Optional[Dict[str, Any]], timeout: float):
+        message = {"jsonrpc": "2.0", "id": next(self._ids), "method": method}
+        if params is not None:
+            message["params"] = params
+        response = await self._send(message, timeout)
+        if response is None:
+            raise MCPError(f"No response to {method}")
+        if "error" in response:
+            error = response["error"] or {}
+            raise MCPError(f"{method} failed: {error.get('message', error)}")
+        return response.get("result")
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None):
+        """Send a JSON-RPC request on the warm session"""
+        self.last_used = time.monotonic()
+        return await self._request(method, params, timeout or MCPConfig.REQUEST_TIMEOUT_SECONDS)
+
+class _StreamSession(MCPSession):
+    """Sessions over a full-duplex stream, with responses matched by request ID"""
+
+    def __init__(self, endpoint: ServerEndpoint):
+        super().__init__(endpoint)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    async def _write(self, data: str):
+        raise NotImplementedError
+
+    def _dispatch(self, raw):
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(message, dict):
+            return
+        if "method" in message:
+            # Server-initiated requests are not supported; notifications are passed on
+            if "id" not in message:
+                self._notify(message)
+            return
+        future = self._pending.pop(message.get("id"), None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def _fail_pending(self, error: Exception):
+        self.connected_at = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def _send(self, message, timeout):
+        if "id" not in message:
+            await self._write(json.dumps(message))
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message["id"]] = future
+        try:
+            await self._write(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message["id"], None)
+
+    async def close(self):
+        await super().close()
+        if self._reader is not None:
+            self._reader.cancel()
+        self._fail_pending(MCPError("Session closed"))
+
+class HTTPSession(MCPSession):
+    """Streamable HTTP transport over the shared keep-alive pool"""
+
+    def __init__(self, endpoint: ServerEndpoint, client: httpx.AsyncClient):
+        super().__init__(endpoint)
+        self._client = client
+        self._session_id: Optional[str] = None
+
+    async def _open(self):
+        self._session_id = None
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {
+            "Accept": "application/json, text/event-stream",
+            "Content-Type": "application/json",
+            **self.endpoint.configuration.get("headers", {}),
+        }
+        if self._session_id:
+            headers["Mcp-Session-Id"] = self._session_id
+        return headers
+
+    async def _send(self, message, timeout):
+        async with self._client.stream(
+            "POST", self.endpoint.url, json=message, headers=self._headers(), timeout=timeout
+        ) as response:
+            # The host may have been re-resolved since connect (DNS rebinding)
+            stream = response.extensions.get("network_stream")
+            server_addr = stream.get_extra_info("server_addr") if stream is not None else None
+            try:
+                _check_peer(response.url.host, server_addr[0] if server_addr else None)
+            except MCPError:
+                self.connected_at = None
+                raise
+            if response.status_code == 404 and self._session_id:
+                # The server expired the session; marking it dropped makes the manager reconnect
+                self._session_id = None
+                self.connected_at = None
+                raise MCPError("MCP session expired")
+            if response.status_code >= 400:
+                raise MCPError(f"HTTP {response.status_code} from MCP server")
+            self._session_id = response.headers.get("Mcp-Session-Id", self._session_id)
+            if "id" not in message:
+                return None
+            if response.headers.get("content-type", "").startswith("text/event-stream"):
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        reply = json.loads(line[5:].strip())
+                        if "method" in reply and "id" not in reply:
+                            self._notify(reply)
+                        elif reply.get("id") == message["id"]:
+                            return reply
+                return None
+            return json.loads(await response.aread())
+
+    async def close(self):
+        if self._session_id:
+            try:
+                await self._client.delete(self.endpoint.url, headers=self._headers(), timeout=5)
+            except httpx.HTTPError:
+                pass
+        await super().close()
+
+class WebSocketSession(_StreamSession):
+    """Long-lived websocket transport"""
+
+    def __init__(self, endpoint: ServerEndpoint):
+        super().__init__(endpoint)
+        self._socket = None
+
+    async def _open(self):
+        import websockets
+        self._socket = await websockets.connect(
+            self.endpoint.url,
+            subprotocols=["mcp"],
+            extra_headers=self.endpoint.configuration.get("headers") or None,
+            max_size=MCPConfig.MAX_MESSAGE_BYTES,
+        )
+        # Redirects are followed during the handshake, so check where the socket ended up
+        remote = self._socket.remote_address
+        try:
+            _check_peer(urlparse(self.endpoint.url).hostname, remote[0] if remote else None)
+        except MCPError:
+            await self._socket.close()
+            raise
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for raw in self._socket:
+                self._dispatch(raw)
+            self._fail_pending(MCPError("Websocket closed by server"))
+        except Exception as e:
+            self._fail_pending(MCPError(f"Websocket failed: {e}"))
+
+    async def _write(self, data: str):
+        try:
+            await self._socket.send(data)
+        except Exception as e:
+            # Closed socket: marking the session dropped makes the manager reconnect
+            self.connected_at = None
+            raise MCPError(f"Websocket send failed: {e or type(e).__name__}")
+
+    async def close(self):
+        await super().close()
+        if self._socket is not None:
+            await self._socket.close()
+
+class StdioSession(_StreamSession):
+    """Newline-delimited JSON-RPC with a supervised local subprocess"""
+
+    def __init__(self, endpoint: ServerEndpoint):
+        super().__init__(endpoint)
+        self._process: Optional[asyncio.subprocess.Process] = None
+
+    async def _open(self):
+        if not stdio_command_allowed(self.endpoint.url):
+            raise MCPError("stdio command is not allowed (see MCP_STDIO_ALLOWED_COMMANDS)")
+        server_env = self.endpoint.configuration.get("env") or {}
+        error = stdio_env_error(server_env)
+        if error:
+            raise MCPError(error)
+        env = {name: os.environ[name] for name in MCPConfig.STDIO_INHERITED_ENV if name in os.environ}
+        env.update({str(k): str(v) for k, v in server_env.items()})
+        argv = shlex.split(self.endpoint.url)
+        self._process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=env,
+            limit=MCPConfig.MAX_MESSAGE_BYTES,
+        )
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self._process.stdout.readline()
+                if not line:
+                    break
+                self._dispatch(line)
+        except Exception as e:
+            self._fail_pending(MCPError(f"stdio read failed: {e}"))
+            return
+        # Supervision: the manager restarts the process on next use or probe
+        code = await self._process.wait()
+        self._fail_pending(MCPError(f"stdio server exited with code {code}"))
+
+    async def _write(self, data: str):
+        if self._process is None or self._process.returncode is not None:
+            self.connected_at = None
+            raise MCPError("stdio server is not running")
+        try:
+            self._process.stdin.write(data.encode() + b"\n")
+            await self._process.stdin.drain()
+        except (OSError, RuntimeError) as e:
+            # Broken pipe: the process is gone or exiting
+            self.connected_at = None
+            raise MCPError(f"stdio write failed: {e or type(e).__name__}")
+
+    async def close(self):
+        await super().close()
+        if self._process is not None and self._process.returncode is None:
+            self._process.terminate()
+            try:
+                await asyncio.wait_for(self._process.wait(), 5)
+            except asyncio.TimeoutError:
+                self._process.kill()
+
+class MCPConnectionManager:
+    """Owns one warm session per MCP server and probes them in the background"""
+
+    def __init__(self):
+        self._sessions: Dict[int, MCPSession] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._backoff: Dict[int, tuple] = {}
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._prober: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[int, Dict[str, Any]], None]] = []
+        self.connects = 0
+        self.connect_failures = 0
+        self.probes = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=MCPConfig.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=MCPConfig.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=MCPConfig.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=httpx.Timeout(MCPConfig.REQUEST_TIMEOUT_SECONDS, connect=MCPConfig.CONNECT_TIMEOUT_SECONDS),
+            )
+        return self._http_client
+
+    def add_notification_listener(self, listener: Callable[[int, Dict[str, Any]], None]):
+        """Receive (server_id, message) for notifications from any server"""
+        self._listeners.append(listener)
+
+    def _dispatch_notification(self, server_id: int, message: Dict[str, Any]):
+        for listener in self._listeners:
+            try:
+                listener(server_id, message)
+            except Exception as e:
+                print(f"✗ MCP notification listener failed: {e}")
+
+    def _new_session(self, endpoint: ServerEndpoint) -> MCPSession:
+        if endpoint.connection_type == "http":
+            session = HTTPSession(endpoint, self._http())
+        elif endpoint.connection_type == "websocket":
+            session = WebSocketSession(endpoint)
+        elif endpoint.connection_type == "stdio":
+            session = StdioSession(endpoint)
+        else:
+            raise MCPError(f"Unsupported connection type: {endpoint.connection_type}")
+        session.on_notification = self._dispatch_notification
+        return session
+
+    async def get_session(self, endpoint: ServerEndpoint) -> MCPSession:
+        """Return the warm session for a server, connecting only if needed"""
+        session = self._sessions.get(endpoint.id)
+        if session is not None and session.connected and session.endpoint.fingerprint == endpoint.fingerprint:
+            return session
+
+        lock = self._locks.setdefault(endpoint.id, asyncio.Lock())
+        async with lock:
+            session = self._sessions.get(endpoint.id)
+            if session is not None and session.connected and session.endpoint.fingerprint == endpoint.fingerprint:
+                return session
+            if session is not None:
+                await session.close()
+                self._sessions.pop(endpoint.id, None)
+
+            failures, retry_at = self._backoff.get(endpoint.id, (0, 0.0))
+            if time.monotonic() < retry_at:
+                raise MCPError("MCP server unavailable, reconnect backing off")
+
+            session = self._new_session(endpoint)
+            try:
+                if endpoint.connection_type in ("http", "websocket"):
+                    await check_public_url(endpoint.url)
+                await session.connect()
+            except Exception as e:
+                await session.close()
+                self.connect_failures += 1
+                delay = min(MCPConfig.RECONNECT_BACKOFF_SECONDS * 2 ** failures, MCPConfig.RECONNECT_BACKOFF_MAX_SECONDS)
+                self._backoff[endpoint.id] = (failures + 1, time.monotonic() + delay)
+                raise e if isinstance(e, MCPError) else MCPError(f"Could not connect to MCP server: {e or type(e).__name__}")
+            self._backoff.pop(endpoint.id, None)
+            self._sessions[endpoint.id] = session
+            self.connects += 1
+            return session
+
+    async def _session_request(self, session: MCPSession, method: str, params: Optional[Dict[str, Any]], timeout: Optional[float]):
+        """Send a request on a session, reporting every failure as MCPError"""
+        try:
+            return await session.request(method, params, timeout)
+        except MCPError:
+            raise
+        except asyncio.TimeoutError:
+            raise MCPError(f"{method} timed out")
+        except httpx.TransportError as e:
+            # The connection is gone, not just this request
+            session.connected_at = None
+            raise MCPError(f"{method} failed: {e or type(e).__name__}")
+        except Exception as e:
+            # Malformed responses and other protocol errors
+            raise MCPError(f"{method} failed: {e or type(e).__name__}")
+
+    async def request(self, endpoint: ServerEndpoint, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None):
+        """Send a request, reconnecting once if the warm session has gone away"""
+        session = await self.get_session(endpoint)
+        try:
+            return await self._session_request(session, method, params, timeout)
+        except MCPError:
+            if session.connected:
+                raise
+        # The session dropped under us (server restart, closed socket, exited process)
+        await self.close_session(endpoint.id)
+        session = await self.get_session(endpoint)
+        return await self._session_request(session, method, params, timeout)
+
+    async def list_tools(self, endpoint: ServerEndpoint) -> List[Dict[str, Any]]:
+        """List all tools a server offers, following pagination"""
+        tools, cursor = [], None
+        while True:
+            result = await self.request(endpoint, "tools/list", {"cursor": cursor} if cursor else None) or {}
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+
+    async def call_tool(self, endpoint: ServerEndpoint, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None):
+        """Call a tool on a server"""
+        return await self.request(endpoint, "tools/call", {"name": name, "arguments": arguments}, timeout)
+
+    async def ping(self, endpoint: ServerEndpoint) -> float:
+        """Round-trip a ping; returns latency in seconds"""
+        started = time.perf_counter()
+        await self.request(endpoint, "ping", timeout=MCPConfig.CONNECT_TIMEOUT_SECONDS)
+        return time.perf_counter() - started
+
+    async def close_session(self, server_id: int):
+        """Close and forget a server's session (after updates or deletion)"""
+        session = self._sessions.pop(server_id, None)
+        self._backoff.pop(server_id, None)
+        if session is not None:
+            await session.close()
+
+    async def probe_all(self):
+        """Ping every active server, warming sessions and recording health"""
+        from ..database import AsyncSessionLocal
+        from . import crud
+
+        async with AsyncSessionLocal() as db:
+            endpoints = [ServerEndpoint.from_model(server) for server in await crud.get_active_mcp_servers(db)]
+
+        # Sessions of deactivated or deleted servers are closed
+        active_ids = {endpoint.id for endpoint in endpoints}
+        for server_id in list(self._sessions):
+            if server_id not in active_ids:
+                await self.close_session(server_id)
+
+        limit = asyncio.Semaphore(MCPConfig.HEALTH_CONCURRENCY)
+
+        async def probe(endpoint: ServerEndpoint) -> bool:
+            async with limit:
+                try:
+                    await self.ping(endpoint)
+                    return True
+                except Exception:
+                    return False
+
+        results = await asyncio.gather(*(probe(endpoint) for endpoint in endpoints))
+        healthy = [endpoint.id for endpoint, ok in zip(endpoints, results) if ok]
+        failed = [endpoint.id for endpoint, ok in zip(endpoints, results) if not ok]
+        async with AsyncSessionLocal() as db:
+            await crud.record_mcp_health(db, healthy, failed, datetime.utcnow())
+        self.probes += 1
+
+    async def _probe_forever(self):
+        while True:
+            try:
+                await self.probe_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"✗ MCP health probe failed: {e}")
+            await asyncio.sleep(MCPConfig.HEALTH_INTERVAL_SECONDS)
+
+    def start(self):
+        """Start the background health prober"""
+        if MCPConfig.HEALTH_INTERVAL_SECONDS > 0 and (self._prober is None or self._prober.done()):
+            self._prober = asyncio.create_task(self._probe_forever())
+
+    async def close(self):
+        """Stop probing and close every session"""
+        if self._prober is not None:
+            self._prober.cancel()
+            try:
+                await self._prober
+            except (asyncio.CancelledError, Exception):
+                pass
+        for server_id in list(self._sessions):
+            await self.close_session(server_id)
+        if self._http_client is not None:
+            await self._http_client.aclose()
+
+    def stats(self) -> dict:
+        """Get connection statistics"""
+        by_type: Dict[str, int] = {}
+        for session in self._sessions.values():
+            by_type[session.endpoint.connection_type] = by_type.get(session.endpoint.connection_type, 0) + 1
+        return {
+            "sessions": len(self._sessions),
+            "sessions_by_type": by_type,
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "backing_off": len(self._backoff),
+            "probes": self.probes,
+        }
+
+# Global instance
+mcp_connections = MCPConnectionManager()
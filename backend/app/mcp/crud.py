@@ -0,0 +1,79 @@
+"""
+CRUD operations for MCP servers
+"""
+
+from datetime import datetime
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func
+from ..database import MCPServer, MCPToolUsage
+from .. import schemas
+from ..security import sanitize_input
+
+async def create_mcp_server(db: AsyncSession, user_id: int, server: schemas.MCPServerCreate) -> MCPServer:
+    """Register an MCP server for a user"""
+    db_server = MCPServer(
+        user_id=user_id,
+        name=sanitize_input(server.name, 100),
+        url=server.url,
+        description=sanitize_input(server.description) if server.description else None,
+        connection_type=server.connection_type or "http",
+        configuration=server.configuration or {},
+        connection_errors=0
+    )
+    db.add(db_server)
+    await db.commit()
+    await db.refresh(db_server)
+    return db_server
+
+async def get_user_mcp_servers(db: AsyncSession, user_id: int) -> List[MCPServer]:
+    """Get all MCP servers of a user"""
+    result = await db.execute(select(MCPServer).where(MCPServer.user_id == user_id).order_by(MCPServer.id))
+    return list(result.scalars().all())
+
+async def get_mcp_server(db: AsyncSession, server_id: int, user_id: int) -> MCPServer:
+    """Get an MCP server owned by a user"""
+    result = await db.execute(select(MCPServer).where(MCPServer.id == server_id, MCPServer.user_id == user_id))
+    return result.scalars().first()
+
+async def get_active_mcp_servers(db: AsyncSession) -> List[MCPServer]:
+    """Get every active MCP server (for the health prober)"""
+    result = await db.execute(select(MCPServer).where(MCPServer.is_active == True))
+    return list(result.scalars().all())
+
+async def update_mcp_server(db: AsyncSession, server_id: int, user_id: int, updates: schemas.MCPServerUpdate) -> MCPServer:
+    """Update an MCP server"""
+    db_server = await get_mcp_server(db, server_id, user_id)
+    if db_server:
+        update_data = updates.model_dump(exclude_unset=True)
+        if update_data.get("name") is not None:
+            update_data["name"] = sanitize_input(update_data["name"], 100)
+        if update_data.get("description"):
+            update_data["description"] = sanitize_input(update_data["description"])
+        for key, value in update_data.items():
+            setattr(db_server, key, value)
+        await db.commit()
+        await db.refresh(db_server)
+    return db_server
+
+async def delete_mcp_server(db: AsyncSession, server_id: int):
+    """Delete an MCP server and its usage statistics"""
+    await db.execute(delete(MCPToolUsage).where(MCPToolUsage.mcp_server_id == server_id))
+    await db.execute(delete(MCPServer).where(MCPServer.id == server_id))
+    await db.commit()
+
+async def record_mcp_health(db: AsyncSession, healthy_ids: List[int], failed_ids: List[int], checked_at: datetime):
+    """Record one probe round: healthy servers reset their error count, failed ones increment it"""
+    if healthy_ids:
+        await db.execute(
+            update(MCPServer)
+            .where(MCPServer.id.in_(healthy_ids))
+            .values(last_connected=checked_at, connection_errors=0)
+        )
+    if failed_ids:
+        await db.execute(
+            update(MCPServer)
+            .where(MCPServer.id.in_(failed_ids))
+            .values(connection_errors=func.coalesce(MCPServer.connection_errors, 0) + 1)
+        )
+    await db.commit()
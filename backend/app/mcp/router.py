@@ -1,9 +1,166 @@
 """
-MCP router placeholder - to be implemented
+MCP router for MCP server management endpoints
 """
 
-from fastapi import APIRouter
+from typing import List, Optional
+from urllib.parse import urlparse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import deps
+from .. import schemas
+from . import crud
+from .connections import (
+    mcp_connections, MCPError, MCPConfig, ServerEndpoint, CONNECTION_TYPES,
+    check_public_url, stdio_command_allowed, stdio_env_error
+)
+from .usage import usage_aggregator
+from .catalog import tool_catalog
+from .tools import load_toolset
 
 router = APIRouter()
 
-# TODO: Implement MCP server management endpoints
+_URL_SCHEMES = {"http": ("http", "https"), "websocket": ("ws", "wss")}
+
+async def _validate_connection(connection_type: str, url: str, configuration: Optional[dict]):
+    """Reject connection types and URLs the connection manager cannot serve"""
+    if connection_type not in CONNECTION_TYPES:
+        raise HTTPException(status_code=400, detail=f"connection_type must be one of: {', '.join(CONNECTION_TYPES)}")
+    if connection_type == "stdio":
+        if not MCPConfig.STDIO_ALLOWED_COMMANDS:
+            raise HTTPException(status_code=400, detail="stdio MCP servers are disabled on this deployment")
+        if not stdio_command_allowed(url):
+            raise HTTPException(status_code=400, detail="stdio command is not in MCP_STDIO_ALLOWED_COMMANDS")
+        error = stdio_env_error((configuration or {}).get("env") or {})
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        return
+    parsed = urlparse(url)
+    if parsed.scheme not in _URL_SCHEMES[connection_type] or not parsed.netloc:
+        raise HTTPException(status_code=400, detail=f"Invalid URL for a {connection_type} MCP server")
+    # Servers are called from this host, so loopback, private and metadata addresses are refused
+    try:
+        await check_public_url(url)
+    except MCPError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _get_server_or_404(db: AsyncSession, server_id: int, user_id: int):
+    server = await crud.get_mcp_server(db, server_id, user_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="MCP server not found")
+    return server
+
+@router.get("/servers", response_model=List[schemas.MCPServer])
+async def get_servers(
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Get the user's MCP servers"""
+    return await crud.get_user_mcp_servers(db, current_user.id)
+
+@router.post("/servers", response_model=schemas.MCPServer)
+async def create_server(
+    server: schemas.MCPServerCreate,
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Register a new MCP server"""
+    await _validate_connection(server.connection_type or "http", server.url, server.configuration)
+    return await crud.create_mcp_server(db, current_user.id, server)
+
+@router.get("/servers/{server_id}", response_model=schemas.MCPServer)
+async def get_server(
+    server_id: int,
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Get an MCP server"""
+    return await _get_server_or_404(db, server_id, current_user.id)
+
+@router.put("/servers/{server_id}", response_model=schemas.MCPServer)
+async def update_server(
+    server_id: int,
+    server_update: schemas.MCPServerUpdate,
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Update an MCP server"""
+    server = await _get_server_or_404(db, server_id, current_user.id)
+    await _validate_connection(
+        server_update.connection_type or server.connection_type,
+        server_update.url or server.url,
+        server_update.configuration if server_update.configuration is not None else server.configuration
+    )
+    server = await crud.update_mcp_server(db, server_id, current_user.id, server_update)
+    # The next call reconnects and refetches tools with the new settings
+    tool_catalog.invalidate(server_id)
+    await mcp_connections.close_session(server_id)
+    return server
+
+@router.delete("/servers/{server_id}")
+async def delete_server(
+    server_id: int,
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Delete an MCP server"""
+    await _get_server_or_404(db, server_id, current_user.id)
+    usage_aggregator.discard_server(server_id)
+    await crud.delete_mcp_server(db, server_id)
+    tool_catalog.invalidate(server_id)
+    await mcp_connections.close_session(server_id)
+    return {"message": "MCP server deleted successfully"}
+
+@router.get("/servers/{server_id}/tools", response_model=List[schemas.MCPToolInfo])
+async def get_server_tools(
+    server_id: int,
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """List the tools an MCP server offers"""
+    server = await _get_server_or_404(db, server_id, current_user.id)
+    if not server.is_active:
+        raise HTTPException(status_code=400, detail="MCP server is inactive")
+    entry = await tool_catalog.get(ServerEndpoint.from_model(server))
+    if entry is None:
+        raise HTTPException(status_code=502, detail="Could not list the MCP server's tools")
+    return [
+        schemas.MCPToolInfo(
+            name=tool.get("name", ""),
+            description=tool.get("description"),
+            input_schema=tool.get("inputSchema") or {}
+        )
+        for tool in entry.tools
+    ]
+
+@router.get("/tools")
+async def get_tools_payload(
+    request: Request,
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Get the function-calling tools payload for all of the user's active servers"""
+    toolset = await load_toolset(db, current_user.id)
+    if request.headers.get("if-none-match") == toolset.etag:
+        return Response(status_code=304, headers={"ETag": toolset.etag})
+    return Response(content=toolset.body, media_type="application/json", headers={"ETag": toolset.etag})
+
+@router.post("/servers/{server_id}/test", response_model=schemas.MCPServerTestResult)
+async def test_server(
+    server_id: int,
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Connect to an MCP server and measure a ping round trip"""
+    server = await _get_server_or_404(db, server_id, current_user.id)
+    endpoint = ServerEndpoint.from_model(server)
+    try:
+        latency = await mcp_connections.ping(endpoint)
+        session = await mcp_connections.get_session(endpoint)
+    except MCPError as e:
+        return schemas.MCPServerTestResult(success=False, error=str(e))
+    return schemas.MCPServerTestResult(
+        success=True,
+        latency_ms=latency * 1000,
+        server_info=session.server_info.get("serverInfo")
+    )
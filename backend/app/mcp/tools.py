@@ -0,0 +1,193 @@
+"""
+MCP tools exposed to chat completions
+Collects the tools of a user's active servers and runs the model's tool
+calls concurrently, each under its own deadline
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import TTLCache
+from . import crud
+from .connections import mcp_connections, MCPError, ServerEndpoint
+from .catalog import tool_catalog, CatalogEntry, serialize_tools
+from .usage import usage_aggregator
+
+# Tool calling configuration
+class ToolConfig:
+    CALL_TIMEOUT_SECONDS = float(os.getenv("MCP_TOOL_TIMEOUT_SECONDS", "15"))
+    # Model round trips per chat turn before the model must answer without tools
+    MAX_ROUNDS = int(os.getenv("MCP_TOOL_MAX_ROUNDS", "5"))
+    # OpenAI accepts at most 128 functions per request
+    MAX_TOOLS = 128
+    MAX_RESULT_CHARS = int(os.getenv("MCP_TOOL_MAX_RESULT_CHARS", "8000"))
+    # Results of idempotent tools are reused for identical arguments (0 disables)
+    MEMO_TTL_SECONDS = float(os.getenv("MCP_TOOL_MEMO_TTL_SECONDS", "60"))
+    MEMO_MAX_ENTRIES = int(os.getenv("MCP_TOOL_MEMO_MAX_ENTRIES", "1000"))
+
+_FUNCTION_NAME_RE = re.compile(r"[^a-zA-Z0-9_-]")
+
+# Memoized results of idempotent tools, keyed by server, tool and arguments
+tool_result_cache = TTLCache(ToolConfig.MEMO_MAX_ENTRIES, ToolConfig.MEMO_TTL_SECONDS)
+
+class ToolBinding(NamedTuple):
+    """One MCP tool as offered to the model"""
+    function_name: str
+    endpoint: ServerEndpoint
+    tool_name: str
+    description: str
+    input_schema: Dict[str, Any]
+    idempotent: bool
+    timeout: float
+
+def _is_idempotent(tool: Dict[str, Any], configuration: Dict[str, Any]) -> bool:
+    """Tools are idempotent if the server annotates them so or the server configuration lists them"""
+    annotations = tool.get("annotations") or {}
+    if annotations.get("readOnlyHint") or annotations.get("idempotentHint"):
+        return True
+    return tool.get("name") in configuration.get("idempotent_tools", [])
+
+def _format_result(result: Dict[str, Any]) -> str:
+    """Flatten an MCP tools/call result into text for the model"""
+    parts = []
+    for item in result.get("content") or []:
+        if item.get("type") == "text":
+            parts.append(item.get("text", ""))
+        elif item.get("type") == "resource":
+            resource = item.get("resource") or {}
+            parts.append(resource.get("text") or f"[resource {resource.get('uri', '')}]")
+        else:
+            parts.append(f"[{item.get('type', 'unknown')} content]")
+    text = "\n".join(parts)
+    if len(text) > ToolConfig.MAX_RESULT_CHARS:
+        text = text[:ToolConfig.MAX_RESULT_CHARS] + "\n[truncated]"
+    return text
+
+class Toolset:
+    """The tools available to one user, built once per catalog version"""
+
+    def __init__(self, user_id: int, bindings: List[ToolBinding]):
+        self.user_id = user_id
+        self.bindings = {binding.function_name: binding for binding in bindings}
+        self._tools = [
+            {
+                "type": "function",
+                "function": {
+                    "name": binding.function_name,
+                    "description": binding.description[:1024],
+                    "parameters": binding.input_schema or {"type": "object", "properties": {}},
+                },
+            }
+            for binding in self.bindings.values()
+        ]
+        # Serialized once and reused byte-for-byte while the catalogs are unchanged
+        self.body = serialize_tools(self._tools)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+    def __bool__(self) -> bool:
+        return bool(self.bindings)
+
+    def openai_tools(self) -> List[Dict[str, Any]]:
+        """Tool definitions in the OpenAI function calling format (shared; do not mutate)"""
+        return self._tools
+
+    async def execute(self, tool_calls) -> List[Dict[str, Any]]:
+        """Run all tool calls of one model response concurrently.
+
+        Returns one record per call, in call order, with the text to send
+        back to the model under ``output``.
+        """
+        records = await asyncio.gather(*(self._execute_one(call) for call in tool_calls))
+        for record in records:
+            if "server_id" in record:
+                usage_aggregator.record(self.user_id, record["server_id"], record["tool"], record["success"])
+        return list(records)
+
+    async def _execute_one(self, call) -> Dict[str, Any]:
+        record = {"id": call.id, "function": call.function.name, "success": False, "cached": False}
+        binding = self.bindings.get(call.function.name)
+        if binding is None:
+            return {**record, "error": "Unknown tool", "output": f"Error: unknown tool {call.function.name}"}
+        record.update(server_id=binding.endpoint.id, tool=binding.tool_name)
+
+        try:
+            arguments = json.loads(call.function.arguments or "{}")
+        except ValueError:
+            return {**record, "error": "Invalid arguments", "output": "Error: arguments were not valid JSON"}
+        record["arguments"] = arguments
+
+        memo_key = None
+        if binding.idempotent and tool_result_cache.enabled:
+            memo_key = (binding.endpoint.id, binding.endpoint.fingerprint, binding.tool_name, json.dumps(arguments, sort_keys=True))
+            cached = tool_result_cache.get(memo_key)
+            if cached is not None:
+                return {**record, "success": True, "cached": True, "duration_ms": 0.0, "output": cached}
+
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                mcp_connections.call_tool(binding.endpoint, binding.tool_name, arguments, timeout=binding.timeout),
+                binding.timeout
+            )
+            output = _format_result(result or {})
+        except asyncio.TimeoutError:
+            error = f"timed out after {binding.timeout:g}s"
+        except MCPError as e:
+            error = str(e)
+        except Exception as e:
+            # One broken server must not fail the other calls or the turn
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        else:
+            if result and result.get("isError"):
+                error = output or "tool reported an error"
+            else:
+                if memo_key is not None:
+                    tool_result_cache.set(memo_key, output)
+                duration_ms = (time.perf_counter() - started) * 1000
+                return {**record, "success": True, "duration_ms": duration_ms, "output": output}
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        return {**record, "error": error, "duration_ms": duration_ms, "output": f"Error: {error}"}
+
+def _server_bindings(entry: CatalogEntry) -> List[ToolBinding]:
+    endpoint = entry.endpoint
+    timeout = float(endpoint.configuration.get("tool_timeout_seconds", ToolConfig.CALL_TIMEOUT_SECONDS))
+    return [
+        ToolBinding(
+            function_name=_FUNCTION_NAME_RE.sub("_", f"mcp{endpoint.id}_{tool['name']}")[:64],
+            endpoint=endpoint,
+            tool_name=tool["name"],
+            description=tool.get("description") or "",
+            input_schema=tool.get("inputSchema") or {},
+            idempotent=_is_idempotent(tool, endpoint.configuration),
+            timeout=timeout,
+        )
+        for tool in entry.tools if tool.get("name")
+    ]
+
+async def load_toolset(db: AsyncSession, user_id: int) -> Toolset:
+    """Get the tools of the user's active MCP servers from the catalog cache"""
+    servers = [server for server in await crud.get_user_mcp_servers(db, user_id) if server.is_active]
+    entries = [
+        entry for entry in await asyncio.gather(*(tool_catalog.get(ServerEndpoint.from_model(server)) for server in servers))
+        if entry is not None
+    ]
+
+    key = (user_id, tool_catalog.signature(entries))
+    toolset = tool_catalog.payloads.get(key)
+    if toolset is None:
+        bindings = {}
+        for entry in sorted(entries, key=lambda entry: entry.endpoint.id):
+            for binding in _server_bindings(entry):
+                # Truncated names can collide; the first server keeps the name
+                bindings.setdefault(binding.function_name, binding)
+        toolset = Toolset(user_id, list(bindings.values())[:ToolConfig.MAX_TOOLS])
+        tool_catalog.payloads.set(key, toolset)
+    return toolset
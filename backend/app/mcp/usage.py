@@ -0,0 +1,201 @@
+"""
+Write-behind aggregation of MCP tool usage statistics
+Tool calls add to in-memory counters; a background task flushes them as
+batched INSERT ... ON CONFLICT DO UPDATE increments, so no request ever
+contends on a usage row
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from ..database import AsyncSessionLocal, MCPToolUsage
+
+# Usage aggregation configuration
+class UsageConfig:
+    FLUSH_INTERVAL_SECONDS = float(os.getenv("MCP_USAGE_FLUSH_INTERVAL_SECONDS", "10"))
+    # Rows per upsert statement
+    FLUSH_BATCH_SIZE = int(os.getenv("MCP_USAGE_FLUSH_BATCH_SIZE", "500"))
+    # Flush early once this many (user, server, tool) keys are pending
+    MAX_PENDING_KEYS = int(os.getenv("MCP_USAGE_MAX_PENDING_KEYS", "10000"))
+
+UsageKey = Tuple[int, int, str]
+
+class UsageDelta:
+    """Counts accumulated for one (user, server, tool) since the last flush"""
+    __slots__ = ("frequency", "success_count", "error_count", "last_used")
+
+    def __init__(self):
+        self.frequency = 0
+        self.success_count = 0
+        self.error_count = 0
+        self.last_used: Optional[datetime] = None
+
+    def add(self, other: "UsageDelta"):
+        self.frequency += other.frequency
+        self.success_count += other.success_count
+        self.error_count += other.error_count
+        if other.last_used and (self.last_used is None or other.last_used > self.last_used):
+            self.last_used = other.last_used
+
+class UsageAggregator:
+    """Buffers MCPToolUsage increments in memory and flushes them periodically"""
+
+    def __init__(self):
+        self._pending: Dict[UsageKey, UsageDelta] = {}
+        # Monotonic time of the oldest unflushed delta
+        self._oldest: Optional[float] = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flush_failures = 0
+        self.dropped_rows = 0
+        self.last_flush_seconds = 0.0
+        self.last_flush_lag_seconds = 0.0
+
+    @property
+    def flush_lag_seconds(self) -> float:
+        """Age of the oldest usage not yet written to the database"""
+        return time.monotonic() - self._oldest if self._oldest is not None else 0.0
+
+    def record(self, user_id: int, server_id: int, tool_name: str, success: bool):
+        """Count one tool invocation (never touches the database)"""
+        key = (user_id, server_id, tool_name[:100])
+        delta = self._pending.get(key)
+        if delta is None:
+            delta = self._pending[key] = UsageDelta()
+        delta.frequency += 1
+        delta.success_count += success
+        delta.error_count += not success
+        delta.last_used = datetime.utcnow()
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self.recorded += 1
+        if len(self._pending) >= UsageConfig.MAX_PENDING_KEYS and self._wake is not None:
+            self._wake.set()
+
+    def discard_server(self, server_id: int):
+        """Drop pending usage of a deleted server"""
+        for key in [key for key in self._pending if key[1] == server_id]:
+            del self._pending[key]
+
+    def _requeue(self, batch: Dict[UsageKey, UsageDelta], oldest: Optional[float]):
+        for key, delta in batch.items():
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = delta
+            else:
+                pending.add(delta)
+        if oldest is not None and (self._oldest is None or oldest < self._oldest):
+            self._oldest = oldest
+
+    async def flush(self):
+        """Write all pending deltas as batched upserts"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, oldest = self._pending, self._oldest
+            self._pending, self._oldest = {}, None
+            started = time.perf_counter()
+
+            # Sorted keys keep lock order consistent across concurrent flushers (other workers)
+            keys = sorted(batch)
+            rows = [
+                {
+                    "user_id": key[0],
+                    "mcp_server_id": key[1],
+                    "tool_name": key[2],
+                    "frequency": delta.frequency,
+                    "success_count": delta.success_count,
+                    "error_count": delta.error_count,
+                    "last_used": delta.last_used,
+                }
+                for key, delta in ((key, batch[key]) for key in keys)
+            ]
+            written = dropped = 0
+            table = MCPToolUsage.__table__.c
+            try:
+                async with AsyncSessionLocal() as db:
+                    for start in range(0, len(rows), UsageConfig.FLUSH_BATCH_SIZE):
+                        chunk = rows[start:start + UsageConfig.FLUSH_BATCH_SIZE]
+                        statement = insert(MCPToolUsage).values(chunk)
+                        try:
+                            await db.execute(statement.on_conflict_do_update(
+                                index_elements=["user_id", "mcp_server_id", "tool_name"],
+                                set_={
+                                    "frequency": func.coalesce(table.frequency, 0) + statement.excluded.frequency,
+                                    "success_count": func.coalesce(table.success_count, 0) + statement.excluded.success_count,
+                                    "error_count": func.coalesce(table.error_count, 0) + statement.excluded.error_count,
+                                    "last_used": func.greatest(table.last_used, statement.excluded.last_used),
+                                },
+                            ))
+                            await db.commit()
+                        except IntegrityError as e:
+                            # A server was deleted by another worker with usage still pending here
+                            await db.rollback()
+                            dropped += len(chunk)
+                            print(f"⚠️  Dropped {len(chunk)} MCP usage rows: {e.orig}")
+                        written = start + len(chunk)
+            except Exception as e:
+                self.flush_failures += 1
+                self._requeue({key: batch[key] for key in keys[written:]}, oldest)
+                print(f"✗ MCP usage flush failed, will retry: {e}")
+            finally:
+                self.flushed_rows += written - dropped
+                self.dropped_rows += dropped
+                self.flushes += 1
+                self.last_flush_seconds = time.perf_counter() - started
+                if oldest is not None:
+                    self.last_flush_lag_seconds = time.monotonic() - oldest
+
+    async def _flush_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), UsageConfig.FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the periodic flusher"""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_forever())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        """Get aggregation statistics"""
+        return {
+            "pending_keys": len(self._pending),
+            "flush_lag_seconds": self.flush_lag_seconds,
+            "last_flush_lag_seconds": self.last_flush_lag_seconds,
+            "last_flush_seconds": self.last_flush_seconds,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "flush_failures": self.flush_failures,
+            "dropped_rows": self.dropped_rows,
+        }
+
+# Global instance
+usage_aggregator = UsageAggregator()
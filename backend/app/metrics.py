@@ -0,0 +1,197 @@
+"""
+Prometheus metrics for the API
+Route latency, in-flight requests, provider latency and throughput,
+database pool usage, password hashing and rate-limit rejections,
+exposed at /metrics
+"""
+
+import os
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Metrics configuration
+class MetricsConfig:
+    ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # When set, /metrics requires "Authorization: Bearer <token>"
+    TOKEN = os.getenv("METRICS_TOKEN")
+    # Set by prometheus_client's multiprocess mode (several uvicorn workers)
+    MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROVIDER_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+TOKENS_PER_SECOND_BUCKETS = (5, 10, 20, 40, 60, 80, 120, 160, 250, 500)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30)
+PASSWORD_HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2, 5)
+
+# Requests
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template (until the body is sent)",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum"
+)
+chat_streams_in_flight = Gauge(
+    "chat_streams_in_flight", "Open chat completion SSE streams", multiprocess_mode="livesum"
+)
+rate_limit_rejections = Counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ["route"]
+)
+
+# LLM providers
+provider_request_duration = Histogram(
+    "provider_request_duration_seconds", "Provider completion latency (full response)",
+    ["model", "stream"], buckets=PROVIDER_BUCKETS
+)
+provider_time_to_first_token = Histogram(
+    "provider_time_to_first_token_seconds", "Time from request to the first streamed token",
+    ["model"], buckets=PROVIDER_BUCKETS
+)
+provider_tokens_per_second = Histogram(
+    "provider_tokens_per_second", "Completion token throughput per response",
+    ["model", "stream"], buckets=TOKENS_PER_SECOND_BUCKETS
+)
+provider_completion_tokens = Counter(
+    "provider_completion_tokens_total", "Completion tokens generated", ["model"]
+)
+provider_errors = Counter(
+    "provider_errors_total", "Failed provider calls", ["model", "error"]
+)
+
+# Database pool
+db_pool_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection",
+    buckets=POOL_WAIT_BUCKETS
+)
+
+# Password hashing
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds", "bcrypt time per hash or verify", ["operation"],
+    buckets=PASSWORD_HASH_BUCKETS
+)
+password_hash_wait = Histogram(
+    "password_hash_wait_seconds", "Time spent queued for a hashing thread", ["operation"],
+    buckets=POOL_WAIT_BUCKETS
+)
+password_hash_calls = Counter(
+    "password_hash_calls_total", "Password hash and verify calls by outcome", ["operation", "outcome"]
+)
+password_hash_in_flight = Gauge(
+    "password_hash_in_flight", "Password hashing calls running or queued", multiprocess_mode="livesum"
+)
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    # Unmatched paths share one label so arbitrary URLs cannot explode cardinality
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight requests per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = _route_template(scope)
+            http_request_duration.labels(scope["method"], route).observe(time.perf_counter() - started)
+            http_requests.labels(scope["method"], route, str(status)).inc()
+
+def record_completion(
+    model: str,
+    started: float,
+    finished: float,
+    completion_tokens: Optional[int],
+    stream: bool,
+    first_token_at: Optional[float] = None
+):
+    """Record one provider completion (times from time.perf_counter())"""
+    if not MetricsConfig.ENABLED:
+        return
+    stream_label = "true" if stream else "false"
+    provider_request_duration.labels(model, stream_label).observe(finished - started)
+    if first_token_at is not None:
+        provider_time_to_first_token.labels(model).observe(first_token_at - started)
+    if completion_tokens:
+        provider_completion_tokens.labels(model).inc(completion_tokens)
+        # Streams measure generation after the first token; otherwise the whole call
+        generating = finished - (first_token_at if first_token_at is not None else started)
+        if generating > 0:
+            provider_tokens_per_second.labels(model, stream_label).observe(completion_tokens / generating)
+
+def record_provider_error(model: str, error: Exception):
+    if not MetricsConfig.ENABLED:
+        return
+    provider_errors.labels(model, type(error).__name__).inc()
+
+def record_password_hash(
+    operation: str,
+    outcome: str,
+    wait_seconds: Optional[float] = None,
+    hash_seconds: Optional[float] = None
+):
+    """Record one password hashing call (timings only for calls that ran)"""
+    if not MetricsConfig.ENABLED:
+        return
+    password_hash_calls.labels(operation, outcome).inc()
+    if hash_seconds is not None:
+        password_hash_wait.labels(operation).observe(wait_seconds)
+        password_hash_duration.labels(operation).observe(hash_seconds)
+
+class DatabasePoolCollector:
+    """Reads pool occupancy at scrape time instead of tracking every checkout"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def collect(self):
+        pool = self.engine.sync_engine.pool
+        for name, description, value in (
+            ("db_pool_size", "Configured pool size", pool.size()),
+            ("db_pool_checked_out", "Connections currently checked out", pool.checkedout()),
+            ("db_pool_overflow", "Connections open beyond the pool size", max(pool.overflow(), 0)),
+            ("db_pool_checked_in", "Idle connections in the pool", pool.checkedin()),
+        ):
+            yield GaugeMetricFamily(name, description, value=value)
+
+def instrument_database(engine, pool_wait_observers: list):
+    """Expose pool gauges and observe checkout waits"""
+    if MetricsConfig.MULTIPROC_DIR is None:
+        REGISTRY.register(DatabasePoolCollector(engine))
+    pool_wait_observers.append(db_pool_wait.observe)
+
+def render_metrics() -> bytes:
+    """Current metrics in the Prometheus text format"""
+    if MetricsConfig.MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -146,6 +146,17 @@ class MCPServer(MCPServerBase):
     class Config:
         from_attributes = True
 
+class MCPToolInfo(BaseModel):
+    name: str
+    description: Optional[str] = None
+    input_schema: Dict[str, Any] = {}
+
+class MCPServerTestResult(BaseModel):
+    success: bool
+    latency_ms: Optional[float] = None
+    server_info: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
 # Vector search schemas
 class VectorSearchRequest(BaseModel):
     query: str
@@ -158,6 +169,8 @@ class VectorSearchResult(BaseModel):
     content: str
     metadata: Dict[str, Any]
     score: float
+    # Reciprocal-rank fusion value when hybrid retrieval is enabled
+    rrf_score: Optional[float] = None
 
 class VectorSearchResponse(BaseModel):
     results: List[VectorSearchResult]
@@ -3,15 +3,19 @@ Security utilities for Gideon AI Chat Studio
 """
 
 import os
+import re
 import hashlib
 import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Callable
-from cryptography.fernet import Fernet
+from functools import lru_cache
+from typing import Optional, Callable, List, NamedTuple, Tuple
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 
+from .cache import TTLCache
+
 # Security configuration
 class SecurityConfig:
     # JWT settings
@@ -21,6 +25,10 @@ class SecurityConfig:
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+    # Authenticated principal cache (0 disables; bounds staleness across workers)
+    PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
     # Encryption settings
     ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
     if not ENCRYPTION_KEY:
@@ -28,6 +36,12 @@ class SecurityConfig:
         print("⚠️  WARNING: ENCRYPTION_KEY not set! Generating temporary key.")
         print("   Set ENCRYPTION_KEY environment variable in production.")
         ENCRYPTION_KEY = base64.b64encode(os.urandom(32)).decode()
+    # Retired keys still accepted for decryption during rotation (comma-separated)
+    PREVIOUS_ENCRYPTION_KEYS = [k.strip() for k in os.getenv("PREVIOUS_ENCRYPTION_KEYS", "").split(",") if k.strip()]
+
+    # Decrypted API key cache (opt-in, 0 disables)
+    API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", "0"))
+    API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "1024"))
 
     # Password security
     MIN_PASSWORD_LENGTH = 8
@@ -45,26 +59,56 @@ def generate_secure_key() -> str:
     """Generate a secure random key for encryption"""
     return base64.b64encode(secrets.token_bytes(32)).decode()
 
+@lru_cache(maxsize=16)
 def get_fernet_instance(encryption_key: str = None) -> Fernet:
-    """Get Fernet instance for encryption"""
+    """Get Fernet instance for encryption (built once per key)"""
     key = encryption_key or SecurityConfig.ENCRYPTION_KEY
     # Ensure key is properly formatted for Fernet
     if len(base64.b64decode(key)) != 32:
         raise ValueError("ENCRYPTION_KEY must be a 32-byte base64 encoded string")
     return Fernet(key.encode())
 
+@lru_cache(maxsize=1)
+def get_multi_fernet() -> MultiFernet:
+    """Get the process-wide MultiFernet (current key first, then retired keys)"""
+    keys = [SecurityConfig.ENCRYPTION_KEY] + SecurityConfig.PREVIOUS_ENCRYPTION_KEYS
+    return MultiFernet([get_fernet_instance(key) for key in keys])
+
 def encrypt_api_key(api_key: str) -> str:
     """Encrypt an API key for storage"""
-    fernet = get_fernet_instance()
-    encrypted = fernet.encrypt(api_key.encode())
+    encrypted = get_multi_fernet().encrypt(api_key.encode())
     return encrypted.decode()
 
 def decrypt_api_key(encrypted_key: str) -> str:
     """Decrypt an API key for use"""
-    fernet = get_fernet_instance()
-    decrypted = fernet.decrypt(encrypted_key.encode())
+    decrypted = get_multi_fernet().decrypt(encrypted_key.encode())
     return decrypted.decode()
 
+def rotate_encrypted_api_key(encrypted_key: str) -> str:
+    """Re-encrypt a stored API key under the current encryption key"""
+    return get_multi_fernet().rotate(encrypted_key.encode()).decode()
+
+# Short-lived cache of decrypted API keys keyed by UserAPIKey.id
+api_key_cache = TTLCache(
+    max_entries=SecurityConfig.API_KEY_CACHE_MAX_ENTRIES,
+    ttl_seconds=SecurityConfig.API_KEY_CACHE_TTL_SECONDS,
+)
+
+def get_cached_api_key(api_key_id: int, user_id: int) -> Optional[str]:
+    """Get a decrypted API key from the cache if it belongs to the user"""
+    entry = api_key_cache.get(api_key_id)
+    if entry is None or entry[0] != user_id:
+        return None
+    return entry[1]
+
+def cache_api_key(api_key_id: int, user_id: int, api_key: str):
+    """Cache a decrypted API key (no-op unless the cache is enabled)"""
+    api_key_cache.set(api_key_id, (user_id, api_key))
+
+def invalidate_cached_api_key(api_key_id: int):
+    """Drop a decrypted API key from the cache"""
+    api_key_cache.pop(api_key_id)
+
 def hash_api_key_preview(api_key: str) -> str:
     """Create a preview hash of API key for display (first/last 4 chars)"""
     if len(api_key) <= 8:
@@ -90,29 +134,78 @@ def validate_password_strength(password: str) -> tuple[bool, str]:
 
     return True, "Password meets requirements"
 
-def sanitize_input(text: str, max_length: int = 5000) -> str:
-    """Sanitize user input to prevent common attacks"""
+# Script injection patterns blocked in user input
+DANGEROUS_PATTERNS = (
+    "<script", "</script>", "javascript:", "data:",
+    "vbscript:", "onload=", "onerror=", "onclick="
+)
+
+# Case-insensitive matcher, used when lowering changes the text length
+_DANGEROUS_PATTERN_RE = re.compile("|".join(re.escape(p) for p in DANGEROUS_PATTERNS), re.IGNORECASE)
+
+# Every pattern contains one of these, so text without them is clean
+_PATTERN_ANCHORS = ("<", ":", "=")
+
+class SanitizerFinding(NamedTuple):
+    pattern: str
+    position: int
+
+def _find_dangerous_patterns(text: str) -> List[SanitizerFinding]:
+    """Locate blocked patterns in any letter case, ordered by position"""
+    if not any(anchor in text for anchor in _PATTERN_ANCHORS):
+        return []
+
+    lowered = text.lower()
+    present = [p for p in DANGEROUS_PATTERNS if p in lowered]
+    if not present:
+        return []
+
+    if len(lowered) != len(text):
+        # Some characters change length when lowered, so offsets would drift
+        return [SanitizerFinding(m.group(0).lower(), m.start()) for m in _DANGEROUS_PATTERN_RE.finditer(text)]
+
+    findings = []
+    for pattern in present:
+        position = lowered.find(pattern)
+        while position != -1:
+            findings.append(SanitizerFinding(pattern, position))
+            position = lowered.find(pattern, position + len(pattern))
+    findings.sort(key=lambda f: f.position)
+    return findings
+
+def sanitize_input_with_findings(text: str, max_length: int = 5000) -> Tuple[str, List[SanitizerFinding]]:
+    """Sanitize user input and report every blocked pattern"""
     if not text:
-        return ""
+        return "", []
 
     # Limit length to prevent DoS
     if len(text) > max_length:
         text = text[:max_length] + "...(truncated)"
 
-    # Remove potential script injection patterns
-    dangerous_patterns = [
-        "<script", "</script>", "javascript:", "data:",
-        "vbscript:", "onload=", "onerror=", "onclick="
-    ]
+    # Remove potential script injection patterns (any letter case)
+    findings = []
+    parts = []
+    cursor = 0
+    for finding in _find_dangerous_patterns(text):
+        if finding.position < cursor:
+            continue
+        parts.append(text[cursor:finding.position])
+        parts.append("[BLOCKED]")
+        cursor = finding.position + len(finding.pattern)
+        findings.append(finding)
+
+    if findings:
+        parts.append(text[cursor:])
+        text = "".join(parts)
+        # Log security incident
+        patterns = ", ".join(sorted({f.pattern for f in findings}))
+        print(f"⚠️  SECURITY: Dangerous pattern detected in user input: {patterns}")
+
+    return text.strip(), findings
 
-    for pattern in dangerous_patterns:
-        if pattern.lower() in text.lower():
-            # Log security incident
-            print(f"⚠️  SECURITY: Dangerous pattern detected in user input: {pattern}")
-            # Replace with safe version
-            text = text.replace(pattern, "[BLOCKED]")
-
-    return text.strip()
+def sanitize_input(text: str, max_length: int = 5000) -> str:
+    """Sanitize user input to prevent common attacks"""
+    return sanitize_input_with_findings(text, max_length)[0]
 
 def rate_limit_identifier(request, key_func: Optional[Callable] = None):
     """Generate rate limit identifier from request"""
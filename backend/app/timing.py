@@ -0,0 +1,144 @@
+"""
+Per-phase timing of chat turns
+Spans accumulate into the turn's timer (found through a context variable,
+so the CRUD layer needs no extra arguments) and are reported as a
+Server-Timing header and one structlog event per turn
+"""
+
+import os
+import re
+import time
+import logging
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import structlog
+
+# Timing configuration
+class TimingConfig:
+    ENABLED = os.getenv("CHAT_TIMING_ENABLED", "true").lower() == "true"
+    # Only turns at least this slow are logged (0 logs every turn)
+    LOG_MIN_MS = float(os.getenv("CHAT_TIMING_LOG_MIN_MS", "0"))
+    # Whether clients see the breakdown in a Server-Timing header
+    SERVER_TIMING_HEADER = os.getenv("CHAT_TIMING_HEADER", "true").lower() == "true"
+
+SERVER_TIMING_HEADER = "Server-Timing"
+_METRIC_NAME_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+# structlog filters by the stdlib level, so give timing events their own INFO logger
+_stdlib_logger = logging.getLogger("chat.timing")
+if not _stdlib_logger.handlers:
+    _stdlib_logger.addHandler(logging.StreamHandler())
+    _stdlib_logger.setLevel(logging.INFO)
+    _stdlib_logger.propagate = False
+logger = structlog.get_logger("chat.timing")
+
+_current: ContextVar[Optional["TurnTimer"]] = ContextVar("turn_timer", default=None)
+
+class _Span:
+    __slots__ = ("timer", "name", "started")
+
+    def __init__(self, timer: "TurnTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.started)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+class TurnTimer:
+    """Accumulates phase durations for one request.
+
+    A phase entered several times (one provider call per tool round) adds
+    up. Spans may nest, so phases can overlap and need not sum to the total.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._token = None
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def span(self, phase: str) -> _Span:
+        return _Span(self, phase)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Phases and the total so far as a Server-Timing header value"""
+        entries = [f"{_METRIC_NAME_RE.sub('_', phase)};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ", ".join(entries)
+
+    def set_header(self, headers):
+        """Add the Server-Timing header to a response's headers"""
+        if TimingConfig.SERVER_TIMING_HEADER:
+            headers[SERVER_TIMING_HEADER] = self.server_timing()
+
+    def log(self, **fields):
+        """Emit one structured event with the phase durations"""
+        total_ms = self.elapsed * 1000
+        if total_ms < TimingConfig.LOG_MIN_MS:
+            return
+        logger.info(
+            "chat_turn_timing",
+            endpoint=self.name,
+            total_ms=round(total_ms, 1),
+            phases_ms={phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+            phase_counts={phase: count for phase, count in self.counts.items() if count > 1},
+            **fields
+        )
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        return False
+
+class _NoTimer(TurnTimer):
+    """Stands in when timing is disabled; records nothing"""
+
+    def add(self, phase: str, seconds: float):
+        pass
+
+    def span(self, phase: str):
+        return _NO_SPAN
+
+    def set_header(self, headers):
+        pass
+
+    def log(self, **fields):
+        pass
+
+def start_turn(name: str) -> TurnTimer:
+    """Create the timer for a request; use as ``with start_turn(...) as timer``"""
+    return TurnTimer(name) if TimingConfig.ENABLED else _NoTimer(name)
+
+def span(phase: str):
+    """Time a phase of the current turn (no-op outside a timed turn)"""
+    timer = _current.get()
+    return timer.span(phase) if timer is not None else _NO_SPAN
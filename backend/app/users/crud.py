@@ -2,29 +2,35 @@
 CRUD operations for User model
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from ..database import User
 from .. import schemas
-from ..auth.utils import verify_password
+from ..auth.hashing import password_hasher
+from ..deps import principal_cache
 
-def get_user(db: Session, user_id: int):
+async def get_user(db: AsyncSession, user_id: int):
     """Get user by ID"""
-    return db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).where(User.id == user_id))
+    return result.scalars().first()
 
-def get_user_by_username(db: Session, username: str):
+async def get_user_by_username(db: AsyncSession, username: str):
     """Get user by username"""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str):
+async def get_user_by_email(db: AsyncSession, email: str):
     """Get user by email"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
     """Get list of users"""
-    return db.query(User).offset(skip).limit(limit).all()
+    result = await db.execute(select(User).offset(skip).limit(limit))
+    return list(result.scalars().all())
 
-def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
     """Create new user"""
     db_user = User(
         username=user.username,
@@ -34,16 +40,16 @@ def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     )
     db.add(db_user)
     try:
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         return None
 
-def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
+async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserUpdate):
     """Update user by ID"""
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await get_user(db, user_id=user_id)
     if not db_user:
         return None
 
@@ -52,28 +58,30 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
         setattr(db_user, field, value)
 
     try:
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        principal_cache.invalidate_user(user_id)
         return db_user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         return None
 
-def delete_user(db: Session, user_id: int):
+async def delete_user(db: AsyncSession, user_id: int):
     """Delete user by ID"""
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await get_user(db, user_id=user_id)
     if not db_user:
         return False
 
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
     return True
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """Authenticate user with username and password"""
-    user = get_user_by_username(db, username=username)
+    user = await get_user_by_username(db, username=username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
     return user
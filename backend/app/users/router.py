@@ -4,7 +4,7 @@ Users router for user management endpoints
 
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import deps
 from .. import schemas
@@ -22,10 +22,10 @@ async def read_users_me(current_user: schemas.User = Depends(deps.get_current_ac
 async def update_user_me(
     user_update: schemas.UserUpdate,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Update current user information"""
-    updated_user = crud.update_user(db, user_id=current_user.id, user_update=user_update)
+    updated_user = await crud.update_user(db, user_id=current_user.id, user_update=user_update)
     if not updated_user:
         raise HTTPException(status_code=400, detail="Failed to update user")
 
@@ -40,11 +40,11 @@ async def get_user_preferences(current_user: schemas.User = Depends(deps.get_cur
 async def update_user_preferences(
     preferences: schemas.UserPreferences,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Update user preferences"""
     user_update = schemas.UserUpdate(preferences=preferences.model_dump())
-    updated_user = crud.update_user(db, user_id=current_user.id, user_update=user_update)
+    updated_user = await crud.update_user(db, user_id=current_user.id, user_update=user_update)
     if not updated_user:
         raise HTTPException(status_code=400, detail="Failed to update preferences")
 
@@ -55,10 +55,10 @@ async def update_user_preferences(
 async def create_api_key(
     api_key_data: schemas.APIKeyCreate,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Create a new API key for the user"""
-    api_key = chat_crud.create_user_api_key(
+    api_key = await chat_crud.create_user_api_key(
         db=db,
         user_id=current_user.id,
         provider=api_key_data.provider,
@@ -78,10 +78,10 @@ async def create_api_key(
 @router.get("/api-keys", response_model=List[schemas.APIKey])
 async def get_api_keys(
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Get all API keys for the user"""
-    api_keys = chat_crud.get_user_api_keys(db, user_id=current_user.id)
+    api_keys = await chat_crud.get_user_api_keys(db, user_id=current_user.id)
     return [
         schemas.APIKey(
             id=key.id,
@@ -98,14 +98,14 @@ async def get_api_keys(
 async def delete_api_key(
     api_key_id: int,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Delete an API key"""
-    api_key = chat_crud.get_user_api_key(db, user_id=current_user.id, api_key_id=api_key_id)
+    api_key = await chat_crud.get_user_api_key(db, user_id=current_user.id, api_key_id=api_key_id)
     if not api_key:
         raise HTTPException(status_code=404, detail="API key not found")
 
-    chat_crud.delete_api_key(db, api_key_id=api_key_id, user_id=current_user.id)
+    await chat_crud.delete_api_key(db, api_key_id=api_key_id, user_id=current_user.id)
     return {"message": "API key deleted successfully"}
 
 @router.get("/models")
@@ -133,22 +133,22 @@ async def read_users(
     skip: int = 0,
     limit: int = 100,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Get list of users (admin only)"""
     # In production, add admin permission check here
-    users = crud.get_users(db, skip=skip, limit=limit)
+    users = await crud.get_users(db, skip=skip, limit=limit)
     return users
 
 @router.get("/{user_id}", response_model=schemas.User)
 async def read_user(
     user_id: int,
     current_user: schemas.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """Get user by ID (admin only)"""
     # In production, add admin permission check here
-    db_user = crud.get_user(db, user_id=user_id)
+    db_user = await crud.get_user(db, user_id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -0,0 +1,98 @@
+"""
+Lazy loaders for vector database backends
+Client libraries are imported and connected on first use, not at startup
+"""
+
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# Vector backend configuration
+class BackendConfig:
+    CHROMA_PATH = os.getenv("CHROMA_PATH", "./data/chroma")
+    # Use a Chroma server instead of the embedded store (needed for multi-process writers)
+    CHROMA_HOST = os.getenv("CHROMA_HOST")
+    CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+    WEAVIATE_URL = os.getenv("WEAVIATE_URL")
+    PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+    PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
+    # A backend that failed to initialize is retried after this long
+    RETRY_SECONDS = float(os.getenv("VECTOR_BACKEND_RETRY_SECONDS", "30"))
+
+class LazyBackend:
+    """Imports and connects a client the first time it is requested.
+
+    ``get`` may block for seconds on first use, so call it from a worker
+    thread (or ``VectorManager.warm_up``), never directly on the event loop.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], configured: bool = True):
+        self.name = name
+        self.configured = configured
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+        self.error: Optional[str] = None
+        self.failed_at = 0.0
+        self.init_seconds = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        """Return the client, initializing it on first use (None if unavailable)"""
+        if self._client is not None or not self.configured:
+            return self._client
+        with self._lock:
+            if self._client is not None:
+                return self._client
+            if self.failed_at and time.monotonic() - self.failed_at < BackendConfig.RETRY_SECONDS:
+                return None
+            started = time.perf_counter()
+            try:
+                self._client = self._factory()
+                self.error = None
+                print(f"✓ {self.name} initialized")
+            except Exception as e:
+                self.error = str(e)
+                self.failed_at = time.monotonic()
+                print(f"✗ {self.name} initialization failed: {e}")
+            finally:
+                self.init_seconds = time.perf_counter() - started
+            return self._client
+
+    def status(self) -> dict:
+        return {
+            "configured": self.configured,
+            "loaded": self.loaded,
+            "init_seconds": self.init_seconds,
+            "error": self.error,
+        }
+
+def _connect_chroma():
+    import chromadb
+    if BackendConfig.CHROMA_HOST:
+        return chromadb.HttpClient(host=BackendConfig.CHROMA_HOST, port=BackendConfig.CHROMA_PORT)
+    return chromadb.PersistentClient(path=BackendConfig.CHROMA_PATH)
+
+def _connect_weaviate():
+    import weaviate
+    return weaviate.Client(url=BackendConfig.WEAVIATE_URL)
+
+def _connect_pinecone():
+    import pinecone
+    pinecone.init(api_key=BackendConfig.PINECONE_API_KEY, environment=BackendConfig.PINECONE_ENVIRONMENT)
+    return pinecone
+
+# Global instances
+chroma_backend = LazyBackend("ChromaDB", _connect_chroma)
+weaviate_backend = LazyBackend("Weaviate", _connect_weaviate, configured=bool(BackendConfig.WEAVIATE_URL))
+pinecone_backend = LazyBackend("Pinecone", _connect_pinecone, configured=bool(BackendConfig.PINECONE_API_KEY))
+
+backends: Dict[str, LazyBackend] = {
+    "chroma": chroma_backend,
+    "weaviate": weaviate_backend,
+    "pinecone": pinecone_backend,
+}
@@ -0,0 +1,174 @@
+"""
+Content-addressed cache of text embeddings
+An in-memory LRU in front of a size-bounded SQLite file
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Embedding cache configuration
+class EmbeddingCacheConfig:
+    ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    MEMORY_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "10000"))
+    # Empty path keeps the cache in memory only
+    DISK_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite3")
+    DISK_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+    # Eviction trims the disk tier to this fraction of its limit
+    DISK_LOW_WATERMARK = 0.9
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies share an entry"""
+    return " ".join(text.split())
+
+def cache_key(model_name: str, text: str) -> str:
+    """Content hash of a model name and normalized text"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode()).hexdigest()
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by ``cache_key``"""
+
+    def __init__(self, memory_max_entries: int, disk_path: str, disk_max_bytes: int):
+        self.memory_max_entries = memory_max_entries
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory_max_entries > 0 or bool(self.disk_path)
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.disk_path and self.disk_max_bytes > 0:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+                db = sqlite3.connect(self.disk_path, check_same_thread=False, isolation_level=None)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_accessed_at ON embeddings (accessed_at)")
+                self._disk_bytes = db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+                self._db = db
+            except sqlite3.Error as e:
+                print(f"✗ Embedding disk cache unavailable: {e}")
+                self.disk_path = ""
+        return self._db
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look up embeddings, promoting disk hits into memory"""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            db = self._disk() if missing else None
+            if db is not None:
+                rows = []
+                # Stay under SQLite's bound-parameter limit
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows += db.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+                if rows:
+                    db.executemany(
+                        "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                        [(time.time(), key) for key, _ in rows]
+                    )
+                self.disk_hits += len(rows)
+            self.misses += len([key for key in missing if key not in found])
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """Store embeddings in both tiers"""
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+            db = self._disk()
+            if db is None:
+                return
+            now = time.time()
+            rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()]
+            db.executemany("INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)", rows)
+            self._disk_bytes += sum(len(blob) for _, blob, _ in rows)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk(db)
+
+    def _evict_disk(self, db: sqlite3.Connection):
+        # Least recently used rows go first
+        target = self.disk_max_bytes * EmbeddingCacheConfig.DISK_LOW_WATERMARK
+        excess = self._disk_bytes - target
+        removed_rows, removed_bytes = 0, 0
+        for key, size in db.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY accessed_at"):
+            if removed_bytes >= excess:
+                break
+            removed_rows += 1
+            removed_bytes += size
+        if removed_rows:
+            db.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+                (removed_rows,)
+            )
+        self.disk_evictions += removed_rows
+        self._disk_bytes = db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def record_saved(self, seconds: float):
+        with self._lock:
+            self.saved_seconds += seconds
+
+    def stats(self) -> dict:
+        """Get cache statistics"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "disk_evictions": self.disk_evictions,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# Global instance
+embedding_cache = EmbeddingCache(
+    memory_max_entries=EmbeddingCacheConfig.MEMORY_MAX_ENTRIES if EmbeddingCacheConfig.ENABLED else 0,
+    disk_path=EmbeddingCacheConfig.DISK_PATH if EmbeddingCacheConfig.ENABLED else "",
+    disk_max_bytes=EmbeddingCacheConfig.DISK_MAX_BYTES,
+)
@@ -0,0 +1,80 @@
+"""
+Sentence embedding model used for message vectors
+"""
+
+import os
+import time
+import threading
+from typing import List
+
+from .embedding_cache import embedding_cache, normalize_text, cache_key
+
+# Embedding model configuration
+class EmbeddingConfig:
+    MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+    # Texts per forward pass inside the model
+    ENCODE_BATCH_SIZE = int(os.getenv("EMBEDDING_ENCODE_BATCH_SIZE", "32"))
+
+class Embedder:
+    """Lazily loaded sentence-transformers model.
+
+    Loading takes seconds and encoding is CPU bound, so both are meant to run
+    off the event loop (see ``EmbeddingIngestor``).
+    """
+
+    def __init__(self, model_name: str, device: str = None):
+        self.model_name = model_name
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+        # Running average encode cost per text, used to value cache hits
+        self.seconds_per_text = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+                    print(f"✓ Embedding model loaded: {self.model_name}")
+        return self._model
+
+    def _encode(self, texts: List[str]):
+        started = time.perf_counter()
+        vectors = self._get_model().encode(
+            texts,
+            batch_size=EmbeddingConfig.ENCODE_BATCH_SIZE,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        per_text = (time.perf_counter() - started) / len(texts)
+        self.seconds_per_text = per_text if not self.seconds_per_text else 0.9 * self.seconds_per_text + 0.1 * per_text
+        return vectors
+
+    def embed(self, texts: List[str], use_cache: bool = True) -> List[List[float]]:
+        """Embed texts into normalized vectors, reusing cached embeddings"""
+        if not texts:
+            return []
+        if not use_cache or not embedding_cache.enabled:
+            return self._encode(texts).tolist()
+
+        texts = [normalize_text(text) for text in texts]
+        keys = [cache_key(self.model_name, text) for text in texts]
+        found = embedding_cache.get_many(keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            computed = dict(zip(missing, self._encode(list(missing.values()))))
+            embedding_cache.put_many(computed)
+            found.update(computed)
+        embedding_cache.record_saved((len(keys) - len(missing)) * self.seconds_per_text)
+
+        return [found[key].tolist() for key in keys]
+
+# Global instance
+embedder = Embedder(EmbeddingConfig.MODEL_NAME, EmbeddingConfig.DEVICE)
@@ -0,0 +1,181 @@
+"""
+Background embedding ingestion for chat messages
+Messages are queued in-process, micro-batched, embedded and handed to a sink
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Awaitable, Callable, List, NamedTuple, Optional
+
+from .embeddings import embedder
+
+# Ingestion pipeline configuration
+class IngestConfig:
+    ENABLED = os.getenv("EMBEDDING_INGEST_ENABLED", "true").lower() == "true"
+    COLLECTION_NAME = os.getenv("EMBEDDING_COLLECTION", "messages")
+    # Messages waiting for a worker; new messages are dropped beyond this
+    QUEUE_MAX_SIZE = int(os.getenv("EMBEDDING_QUEUE_MAX_SIZE", "10000"))
+    # A batch is flushed when it reaches this size or has waited this long
+    BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    BATCH_WAIT_SECONDS = float(os.getenv("EMBEDDING_BATCH_WAIT_SECONDS", "0.5"))
+    # Threads running the model; torch releases the GIL while encoding
+    WORKER_THREADS = int(os.getenv("EMBEDDING_WORKER_THREADS", "1"))
+    # Time allowed on shutdown to embed what is still queued
+    DRAIN_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_DRAIN_TIMEOUT_SECONDS", "10"))
+
+# Roles whose messages are embedded for similarity search
+EMBEDDED_ROLES = ("user", "assistant")
+
+def message_metadata(conversation_id: int, user_id: int, role: str, created_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Vector metadata stored with each message embedding"""
+    metadata = {"conversation_id": conversation_id, "user_id": user_id, "role": role}
+    if created_at is not None:
+        # Timestamps are stored as naive UTC
+        metadata["created_at"] = created_at.replace(tzinfo=timezone.utc).timestamp()
+    return metadata
+
+class EmbeddingJob(NamedTuple):
+    id: str
+    text: str
+    metadata: Dict[str, Any]
+    enqueued_at: float
+
+class EmbeddingIngestor:
+    """Bounded queue plus a worker that embeds and upserts in batches.
+
+    ``submit`` never blocks: the chat request only pays for a ``put_nowait``.
+    """
+
+    def __init__(self):
+        self.sink = None
+        self.text_index = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.embedded = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_batch_lag_seconds = 0.0
+        self.busy_seconds_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self, sink: Callable[..., Awaitable], text_index=None):
+        """Start the worker; ``sink(ids, embeddings, documents, metadatas)`` stores vectors"""
+        if not IngestConfig.ENABLED or sink is None or self.running:
+            return
+        self.sink = sink
+        self.text_index = text_index
+        self._queue = asyncio.Queue(maxsize=IngestConfig.QUEUE_MAX_SIZE)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, IngestConfig.WORKER_THREADS), thread_name_prefix="embed"
+        )
+        self._worker = asyncio.create_task(self._run())
+        print("✓ Embedding ingestion started")
+
+    def submit(self, job_id: str, text: str, metadata: Dict[str, Any]) -> bool:
+        """Queue a text for embedding; returns False if it was not accepted"""
+        if not self.running or not text:
+            return False
+        try:
+            self._queue.put_nowait(EmbeddingJob(job_id, text, metadata, time.monotonic()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _next_batch(self) -> List[EmbeddingJob]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + IngestConfig.BATCH_WAIT_SECONDS
+        while len(batch) < IngestConfig.BATCH_SIZE:
+            # Take whatever is already queued without waiting
+            while len(batch) < IngestConfig.BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.monotonic()
+            if len(batch) >= IngestConfig.BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _embed(self, batch: List[EmbeddingJob]) -> List[List[float]]:
+        if self.text_index is not None:
+            # Lexical indexing is cheap and should not wait on the model
+            self.text_index.upsert([job.id for job in batch], [job.text for job in batch], [job.metadata for job in batch])
+        return embedder.embed([job.text for job in batch])
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            started = time.monotonic()
+            try:
+                embeddings = await loop.run_in_executor(self._executor, self._embed, batch)
+                await self.sink(
+                    [job.id for job in batch],
+                    embeddings,
+                    [job.text for job in batch],
+                    [job.metadata for job in batch],
+                )
+                self.embedded += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"✗ Embedding batch of {len(batch)} failed: {e}")
+            finally:
+                self.busy_seconds_total += time.monotonic() - started
+                self.batches += 1
+                self.last_batch_size = len(batch)
+                self.max_batch_size = max(self.max_batch_size, len(batch))
+                self.last_batch_lag_seconds = started - batch[0].enqueued_at
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def stop(self, drain_timeout: float = IngestConfig.DRAIN_TIMEOUT_SECONDS):
+        """Embed what is queued (up to drain_timeout) and stop the worker"""
+        if self._worker is None:
+            return
+        if self.running:
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️  Embedding queue not drained, {self._queue.qsize()} messages skipped")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._worker = None
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Get ingestion statistics"""
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": IngestConfig.QUEUE_MAX_SIZE,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "embedded": self.embedded,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": (self.embedded + self.failed) / self.batches if self.batches else 0.0,
+            "last_batch_lag_seconds": self.last_batch_lag_seconds,
+            "messages_per_second": self.embedded / self.busy_seconds_total if self.busy_seconds_total else 0.0,
+        }
+
+# Global instance
+embedding_ingestor = EmbeddingIngestor()
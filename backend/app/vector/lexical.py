@@ -0,0 +1,179 @@
+"""
+Incremental per-user BM25 index over message content
+Catches exact identifiers, error codes and names that embeddings blur
+"""
+
+import os
+import re
+import math
+import heapq
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Lexical index configuration
+class LexicalConfig:
+    # Users whose index is kept in memory; the least recently used are dropped
+    MAX_USERS = int(os.getenv("LEXICAL_INDEX_MAX_USERS", "1000"))
+    MAX_DOCS_PER_USER = int(os.getenv("LEXICAL_INDEX_MAX_DOCS_PER_USER", "20000"))
+    K1 = 1.2
+    B = 0.75
+
+# Words plus dotted/dashed identifiers such as ERR_CONN_RESET, v1.2.3 or foo.bar()
+_TOKEN_RE = re.compile(r"[0-9A-Za-z_]+(?:[.\-:/][0-9A-Za-z_]+)*")
+_SEPARATOR_RE = re.compile(r"[.\-:/]")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms, keeping compound identifiers and their parts"""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        parts = _SEPARATOR_RE.split(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+class UserLexicalIndex:
+    """Inverted index of one user's messages"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: "OrderedDict[str, int]" = OrderedDict()
+        self.documents: Dict[str, tuple] = {}
+        self.total_length = 0
+        # Whether the user's stored history has been loaded (not just new messages)
+        self.complete = False
+
+    def remove(self, doc_id: str):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        content, _ = self.documents.pop(doc_id)
+        for term in set(tokenize(content)):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+        self.total_length -= length
+
+    def add(self, doc_id: str, content: str, metadata: Dict[str, Any]):
+        self.remove(doc_id)
+        terms = Counter(tokenize(content))
+        length = sum(terms.values())
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        self.doc_lengths[doc_id] = length
+        self.documents[doc_id] = (content, metadata)
+        self.total_length += length
+        # Oldest messages fall out first
+        while len(self.doc_lengths) > LexicalConfig.MAX_DOCS_PER_USER:
+            self.remove(next(iter(self.doc_lengths)))
+
+    def search(self, query: str, limit: int, conversation_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        doc_count = len(self.doc_lengths)
+        if not doc_count:
+            return []
+        average_length = self.total_length / doc_count or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, frequency in docs.items():
+                norm = LexicalConfig.K1 * (1 - LexicalConfig.B + LexicalConfig.B * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (LexicalConfig.K1 + 1) / (frequency + norm)
+
+        if conversation_id is not None:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if self.documents[doc_id][1].get("conversation_id") == conversation_id
+            }
+        results = []
+        for doc_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            content, metadata = self.documents[doc_id]
+            results.append({"id": doc_id, "content": content, "metadata": metadata, "score": score})
+        return results
+
+class LexicalIndex:
+    """Per-user BM25 indexes, updated incrementally as messages are ingested.
+
+    The index lives in memory; a user's stored history is loaded with
+    ``load_user`` the first time they search after a restart or eviction.
+    """
+
+    def __init__(self):
+        self._users: "OrderedDict[int, UserLexicalIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user(self, user_id: int, create: bool) -> Optional[UserLexicalIndex]:
+        index = self._users.get(user_id)
+        if index is None and create:
+            index = self._users[user_id] = UserLexicalIndex()
+            while len(self._users) > LexicalConfig.MAX_USERS:
+                self._users.popitem(last=False)
+        if index is not None:
+            self._users.move_to_end(user_id)
+        return index
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Index documents under the ``user_id`` of their metadata"""
+        with self._lock:
+            for doc_id, content, metadata in zip(ids, documents, metadatas):
+                self._user(int(metadata["user_id"]), create=True).add(str(doc_id), content, metadata)
+
+    def is_complete(self, user_id: int) -> bool:
+        """Whether the user's index covers their stored history"""
+        with self._lock:
+            index = self._users.get(user_id)
+            return index is not None and index.complete
+
+    def load_user(self, user_id: int, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Rebuild a user's index from stored messages (oldest first), keeping messages ingested meanwhile"""
+        index = UserLexicalIndex()
+        for doc_id, content, metadata in zip(ids, documents, metadatas):
+            index.add(str(doc_id), content, metadata)
+        with self._lock:
+            current = self._users.get(user_id)
+            if current is not None:
+                for doc_id in current.doc_lengths:
+                    if doc_id not in index.documents:
+                        content, metadata = current.documents[doc_id]
+                        index.add(doc_id, content, metadata)
+            index.complete = True
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > LexicalConfig.MAX_USERS:
+                self._users.popitem(last=False)
+
+    def search(self, user_id: int, query: str, limit: int = 5, conversation_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Top BM25 matches for one user, optionally within a conversation"""
+        with self._lock:
+            index = self._user(user_id, create=False)
+            if index is None:
+                return []
+            return index.search(query, limit, conversation_id)
+
+    def stats(self) -> dict:
+        """Get index statistics"""
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "complete_users": sum(index.complete for index in self._users.values()),
+                "documents": sum(len(index.doc_lengths) for index in self._users.values()),
+            }
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], limit: int, k: int = 60) -> List[Dict[str, Any]]:
+    """Merge ranked result lists by sum(1 / (k + rank)), kept in ``rrf_score``"""
+    fused: Dict[str, float] = {}
+    documents: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            fused[result["id"]] = fused.get(result["id"], 0.0) + 1.0 / (k + rank)
+            documents.setdefault(result["id"], result)
+    ranked = heapq.nlargest(limit, fused.items(), key=lambda item: item[1])
+    return [{**documents[doc_id], "rrf_score": score} for doc_id, score in ranked]
+
+# Global instance
+lexical_index = LexicalIndex()
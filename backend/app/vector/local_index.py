@@ -0,0 +1,222 @@
+"""
+Built-in vector index used when no external vector database is available
+Vectors are kept in per-user memory-mapped shards and searched with NumPy
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Local index configuration
+class LocalIndexConfig:
+    PATH = os.getenv("LOCAL_VECTOR_INDEX_PATH", "./data/vector_index")
+    # Shards kept mapped at once; older idle ones are closed and reopened on demand
+    MAX_OPEN_SHARDS = int(os.getenv("LOCAL_VECTOR_INDEX_MAX_OPEN_SHARDS", "64"))
+    INITIAL_CAPACITY = 1024
+
+class VectorShard:
+    """Append-only float32 vectors for one user, backed by memory-mapped files.
+
+    ``shard.json`` holds the committed row count and is written last, so rows
+    from an interrupted write are ignored on reopen.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dim = 0
+        self.count = 0
+        self.capacity = 0
+        self.vectors = None
+        self.ids = None
+        self.conversations = None
+        self.offsets = None
+        self._rows: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # Threads currently using the shard; guarded by the index lock
+        self.users = 0
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        header = self._file("shard.json")
+        if not os.path.exists(header):
+            return
+        with open(header) as f:
+            state = json.load(f)
+        self.dim, self.count, self.capacity = state["dim"], state["count"], state["capacity"]
+        self._map()
+        self._rows = {row_id: row for row, row_id in enumerate(self.ids[:self.count].tolist())}
+
+    def _map(self):
+        self.vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+        self.ids = np.memmap(self._file("ids.i64"), dtype=np.int64, mode="r+", shape=(self.capacity,))
+        self.conversations = np.memmap(self._file("conversations.i64"), dtype=np.int64, mode="r+", shape=(self.capacity,))
+        self.offsets = np.memmap(self._file("offsets.i64"), dtype=np.int64, mode="r+", shape=(self.capacity,))
+
+    def _grow(self, needed: int):
+        capacity = max(self.capacity, LocalIndexConfig.INITIAL_CAPACITY)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for name, row_bytes in (("vectors.f32", 4 * self.dim), ("ids.i64", 8), ("conversations.i64", 8), ("offsets.i64", 8)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(capacity * row_bytes)
+        self.capacity = capacity
+        self._map()
+
+    def _commit(self):
+        for array in (self.vectors, self.ids, self.conversations, self.offsets):
+            array.flush()
+        tmp = self._file("shard.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "count": self.count, "capacity": self.capacity}, f)
+        os.replace(tmp, self._file("shard.json"))
+
+    def upsert(self, ids: List[int], vectors: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert or overwrite rows by message ID"""
+        with self._lock:
+            if not self.dim:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match shard dimension {self.dim}")
+
+            new_ids = [row_id for row_id in dict.fromkeys(ids) if row_id not in self._rows]
+            self._grow(self.count + len(new_ids))
+            for row_id in new_ids:
+                self._rows[row_id] = self.count
+                self.count += 1
+
+            rows = np.fromiter((self._rows[row_id] for row_id in ids), dtype=np.int64, count=len(ids))
+            with open(self._file("documents.jsonl"), "ab") as f:
+                offsets = []
+                for row_id, document, metadata in zip(ids, documents, metadatas):
+                    offsets.append(f.tell())
+                    f.write(json.dumps({"id": row_id, "content": document, "metadata": metadata}).encode() + b"\n")
+
+            self.vectors[rows] = vectors
+            self.ids[rows] = ids
+            self.conversations[rows] = [int(m.get("conversation_id", -1)) for m in metadatas]
+            self.offsets[rows] = offsets
+            self._commit()
+
+    def search(self, query: np.ndarray, limit: int, threshold: float, conversation_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Top-k rows by cosine similarity (vectors are normalized)"""
+        with self._lock:
+            if not self.count or query.shape[0] != self.dim:
+                return []
+            if conversation_id is not None:
+                rows = np.flatnonzero(self.conversations[:self.count] == conversation_id)
+                if not rows.size:
+                    return []
+                scores = self.vectors[rows] @ query
+            else:
+                rows = None
+                scores = self.vectors[:self.count] @ query
+
+            candidates = np.flatnonzero(scores >= threshold)
+            if candidates.size > limit:
+                top = np.argpartition(scores[candidates], -limit)[-limit:]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-scores[candidates])]
+            selected = [(int(rows[i] if rows is not None else i), float(scores[i])) for i in candidates]
+            offsets = [int(self.offsets[row]) for row, _ in selected]
+
+        results = []
+        with open(self._file("documents.jsonl"), "rb") as f:
+            for offset, (_, score) in zip(offsets, selected):
+                f.seek(offset)
+                document = json.loads(f.readline())
+                results.append({
+                    "id": str(document["id"]),
+                    "content": document["content"],
+                    "metadata": document["metadata"],
+                    "score": score,
+                })
+        return results
+
+class LocalVectorIndex:
+    """Per-user shards exposing the Chroma collection ``upsert`` signature"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._shards: "OrderedDict[int, VectorShard]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _shard(self, user_id: int) -> Iterator[VectorShard]:
+        """Hold a user's shard open for the duration of the block"""
+        with self._lock:
+            shard = self._shards.get(user_id)
+            if shard is None:
+                shard = VectorShard(os.path.join(self.path, f"user_{int(user_id)}"))
+                self._shards[user_id] = shard
+            else:
+                self._shards.move_to_end(user_id)
+            shard.users += 1
+            self._evict()
+        try:
+            yield shard
+        finally:
+            with self._lock:
+                shard.users -= 1
+                self._evict()
+
+    def _evict(self):
+        # Shards in use by another thread stay cached, so each path has exactly one VectorShard
+        excess = len(self._shards) - LocalIndexConfig.MAX_OPEN_SHARDS
+        if excess <= 0:
+            return
+        idle = [user_id for user_id, shard in self._shards.items() if not shard.users]
+        for user_id in idle[:excess]:
+            del self._shards[user_id]
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Add vectors, routing each to the shard of its ``user_id`` metadata"""
+        by_user: Dict[int, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            by_user.setdefault(int(metadata["user_id"]), []).append(i)
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        for user_id, positions in by_user.items():
+            with self._shard(user_id) as shard:
+                shard.upsert(
+                    [int(ids[i]) for i in positions],
+                    vectors[positions],
+                    [documents[i] for i in positions],
+                    [metadatas[i] for i in positions],
+                )
+
+    def search(
+        self,
+        user_id: int,
+        query_embedding: List[float],
+        limit: int = 5,
+        threshold: float = 0.0,
+        conversation_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Search one user's vectors, optionally within a conversation"""
+        if not os.path.exists(os.path.join(self.path, f"user_{int(user_id)}", "shard.json")):
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        with self._shard(user_id) as shard:
+            return shard.search(query, limit, threshold, conversation_id)
+
+    def stats(self) -> dict:
+        """Get index statistics for open shards"""
+        with self._lock:
+            shards = list(self._shards.values())
+        return {
+            "open_shards": len(shards),
+            "open_vectors": sum(shard.count for shard in shards),
+        }
+
+# Global instance
+local_index = LocalVectorIndex(LocalIndexConfig.PATH)
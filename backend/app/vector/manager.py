@@ -3,43 +3,238 @@ Vector database manager for Gideon AI Chat MCP Studio
 Handles initialization and coordination of vector databases
 """
 
+import os
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional
+
+from .embeddings import embedder
+from .embedding_cache import embedding_cache
+from .ingest import embedding_ingestor, message_metadata, IngestConfig, EMBEDDED_ROLES
+from .local_index import local_index
+from .lexical import lexical_index, reciprocal_rank_fusion, LexicalConfig
+from .backends import backends, chroma_backend, weaviate_backend, pinecone_backend
+from .routing import vector_router
+
+# Retrieval configuration
+class RetrievalConfig:
+    HYBRID_ENABLED = os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() == "true"
+    # Whatever has not answered by then is left out of the fused result
+    BUDGET_SECONDS = float(os.getenv("RETRIEVAL_BUDGET_MS", "250")) / 1000
+    # Each retriever returns this many candidates per requested result
+    CANDIDATES_PER_RESULT = 4
+    # Load the embedding model during background warm-up, not on first message
+    WARM_UP_MODEL = os.getenv("VECTOR_WARM_UP_MODEL", "true").lower() == "true"
+
 class VectorManager:
     """Manages vector database connections and operations"""
     
     def __init__(self):
-        self.chroma_client = None
-        self.weaviate_client = None
-        self.pinecone_client = None
+        self.budget_exceeded = 0
         self.initialized = False
-    
-    def initialize(self, chroma_client=None, weaviate_client=None, pinecone_client=None):
-        """Initialize vector database clients"""
-        self.chroma_client = chroma_client
-        self.weaviate_client = weaviate_client
-        self.pinecone_client = pinecone_client
+        # Per-user loads of stored history into the lexical index, one at a time
+        self._lexical_loads: Dict[int, asyncio.Task] = {}
+
+    @property
+    def chroma_client(self):
+        return chroma_backend.get()
+
+    @property
+    def weaviate_client(self):
+        return weaviate_backend.get()
+
+    @property
+    def pinecone_client(self):
+        return pinecone_backend.get()
+
+    def initialize(self):
+        """Prepare the manager; backends connect lazily on first use"""
         self.initialized = True
         print("✓ Vector manager initialized")
+
+    async def write_vectors(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Hand embedded messages to the router, which batches writes per backend"""
+        await vector_router.write(IngestConfig.COLLECTION_NAME, ids, embeddings, documents, metadatas)
+
+    def _warm_up(self):
+        for backend in backends.values():
+            backend.get()
+        for store in vector_router.route(IngestConfig.COLLECTION_NAME):
+            try:
+                store.warm_up()
+            except Exception as e:
+                print(f"⚠️  Vector store {store.name} not ready: {e}")
+        if RetrievalConfig.WARM_UP_MODEL:
+            embedder.embed(["warm-up"])
+
+    async def warm_up(self):
+        """Connect configured backends and load the model in the background"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._warm_up)
+            print("✓ Vector backends warmed up")
+        except Exception as e:
+            print(f"⚠️  Vector warm-up incomplete: {e}")
+
+    def start(self):
+        """Start background embedding ingestion (needs a running event loop)"""
+        embedding_ingestor.start(self.write_vectors, lexical_index if RetrievalConfig.HYBRID_ENABLED else None)
+
+    async def stop(self):
+        """Flush queued embeddings and stop background ingestion"""
+        await embedding_ingestor.stop()
+        await vector_router.close()
+        embedding_cache.close()
     
-    def search_similar_messages(self, query: str, conversation_id: str):
-        """Search for similar messages in vector database"""
-        # Placeholder implementation - would integrate with actual vector search
-        return []
-    
-    def add_message_embedding(self, message: str, metadata: dict = None):
-        """Add message embedding to vector database"""
-        # Placeholder implementation - would add to vector database
-        pass
+    async def _embed_query(self, query: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(None, embedder.embed, [query]))[0]
+
+    async def _vector_search(self, query_embedding: Awaitable, user_id: int, conversation_id: Optional[int], limit: int, threshold: float):
+        return await vector_router.query(
+            IngestConfig.COLLECTION_NAME, await query_embedding, user_id, conversation_id, limit, threshold
+        )
+
+    async def _load_lexical_history(self, user_id: int):
+        """Index a user's stored messages (the lexical index starts empty after a restart)"""
+        from sqlalchemy import select
+        from ..database import AsyncSessionLocal, Conversation, Message
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Message.id, Message.content, Message.role, Message.conversation_id, Message.created_at)
+                .join(Conversation, Conversation.id == Message.conversation_id)
+                .where(Conversation.user_id == user_id, Message.role.in_(EMBEDDED_ROLES))
+                .order_by(Message.id.desc())
+                .limit(LexicalConfig.MAX_DOCS_PER_USER)
+            )
+            rows = result.all()
+        # Oldest first, so the newest messages survive the per-user cap
+        rows.reverse()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None,
+            lexical_index.load_user,
+            user_id,
+            [str(row.id) for row in rows],
+            [row.content for row in rows],
+            [message_metadata(row.conversation_id, user_id, row.role, row.created_at) for row in rows],
+        )
+
+    def _lexical_load_done(self, user_id: int, task: asyncio.Task):
+        if self._lexical_loads.get(user_id) is task:
+            del self._lexical_loads[user_id]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"✗ Lexical index load for user {user_id} failed: {task.exception()}")
+
+    async def _ensure_lexical_history(self, user_id: int):
+        if lexical_index.is_complete(user_id):
+            return
+        task = self._lexical_loads.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._load_lexical_history(user_id))
+            self._lexical_loads[user_id] = task
+            task.add_done_callback(lambda done: self._lexical_load_done(user_id, done))
+        # Shielded so a search that runs out of budget does not abort the load
+        await asyncio.shield(task)
+
+    async def _lexical_search(self, query: str, query_embedding: Awaitable, user_id: int, conversation_id: Optional[int], limit: int, threshold: float):
+        """BM25 matches in BM25 order, scored by similarity so the threshold applies to them too"""
+        try:
+            await self._ensure_lexical_history(user_id)
+        except Exception:
+            # Reported by _lexical_load_done; search whatever has been ingested
+            pass
+        loop = asyncio.get_running_loop()
+        hits = await loop.run_in_executor(None, lexical_index.search, user_id, query, limit, conversation_id)
+        if not hits:
+            return []
+        # Ingested messages were embedded already, so these are mostly embedding cache hits
+        vectors = await loop.run_in_executor(None, embedder.embed, [hit["content"] for hit in hits])
+        query_vector = await query_embedding
+        results = []
+        for hit, vector in zip(hits, vectors):
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            score = sum(a * b for a, b in zip(query_vector, vector))
+            if score >= threshold:
+                results.append({**hit, "score": score})
+        return results
+
+    async def search_similar_messages(
+        self,
+        query: str,
+        user_id: int,
+        conversation_id: Optional[int] = None,
+        limit: int = 5,
+        threshold: float = 0.7
+    ) -> List[Dict[str, Any]]:
+        """Search a user's messages, best match first.
+
+        Vector and BM25 searches run concurrently and are merged with
+        reciprocal-rank fusion; a search still running when the retrieval
+        budget expires is left out. Every result has a similarity of at
+        least ``threshold`` in ``score``; the fused rank value is in
+        ``rrf_score``.
+        """
+        if not query:
+            return []
+        if not RetrievalConfig.HYBRID_ENABLED:
+            try:
+                return await self._vector_search(self._embed_query(query), user_id, conversation_id, limit, threshold)
+            except Exception as e:
+                print(f"✗ Vector search failed: {e}")
+                return []
+
+        candidates = max(limit * RetrievalConfig.CANDIDATES_PER_RESULT, limit)
+        query_embedding = asyncio.ensure_future(self._embed_query(query))
+        searches = [
+            asyncio.ensure_future(self._vector_search(query_embedding, user_id, conversation_id, candidates, threshold)),
+            asyncio.ensure_future(self._lexical_search(query, query_embedding, user_id, conversation_id, candidates, threshold)),
+        ]
+        done, pending = await asyncio.wait(searches, timeout=RetrievalConfig.BUDGET_SECONDS)
+        for future in pending:
+            future.cancel()
+        if pending:
+            query_embedding.cancel()
+            self.budget_exceeded += 1
+
+        ranked = []
+        for future in searches:
+            if future in done:
+                if future.exception() is not None:
+                    print(f"✗ Retrieval failed: {future.exception()}")
+                else:
+                    ranked.append(future.result())
+        return reciprocal_rank_fusion(ranked, limit)
+
+    def add_message_embedding(
+        self,
+        message_id: int,
+        message: str,
+        conversation_id: int,
+        user_id: int,
+        role: str,
+        created_at: Optional[datetime] = None
+    ) -> bool:
+        """Queue a message for embedding; never waits on the model"""
+        metadata = message_metadata(conversation_id, user_id, role, created_at)
+        return embedding_ingestor.submit(str(message_id), message, metadata)
+
+    def stats(self) -> dict:
+        """Get vector pipeline statistics"""
+        return {
+            "backends": {name: backend.status() for name, backend in backends.items()},
+            "routing": vector_router.stats(),
+            "ingest": embedding_ingestor.stats(),
+            "local_index": local_index.stats(),
+            "embedding_cache": embedding_cache.stats(),
+            "lexical_index": lexical_index.stats(),
+            "retrieval_budget_exceeded": self.budget_exceeded,
+        }
     
     def get_available_providers(self):
-        """Get list of available vector database providers"""
-        providers = []
-        if self.chroma_client:
-            providers.append("chroma")
-        if self.weaviate_client:
-            providers.append("weaviate") 
-        if self.pinecone_client:
-            providers.append("pinecone")
-        return providers
+        """Get list of configured vector database providers that have not failed"""
+        return [name for name, backend in backends.items() if backend.configured and backend.error is None]
 
 # Global instance
 vector_manager = VectorManager()
@@ -0,0 +1,331 @@
+"""
+Routes vector reads and writes across configured backends
+Queries fail over (or fan out) under a deadline; writes are batched per backend
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from .stores import VectorStore, stores
+
+# Vector routing configuration
+class RoutingConfig:
+    # "collection=backend,backend;..." with backends in preference order
+    ROUTES = os.getenv("VECTOR_ROUTES", "messages=chroma,local")
+    DEFAULT_ROUTE = os.getenv("VECTOR_DEFAULT_ROUTE", "chroma,local")
+    # failover: one backend at a time; first/merged: query all at once
+    QUERY_MODE = os.getenv("VECTOR_QUERY_MODE", "failover")
+    QUERY_DEADLINE_SECONDS = float(os.getenv("VECTOR_QUERY_DEADLINE_MS", "200")) / 1000
+    # An attempt may take this multiple of the backend's p99 before failing over
+    ATTEMPT_P99_MULTIPLIER = 2.0
+    MIN_ATTEMPT_SECONDS = 0.02
+    # Backends above this recent error rate are tried last
+    MAX_ERROR_RATE = float(os.getenv("VECTOR_MAX_ERROR_RATE", "0.5"))
+    LATENCY_WINDOW = 512
+    WORKERS_PER_BACKEND = int(os.getenv("VECTOR_WORKERS_PER_BACKEND", "4"))
+    # Buffered writes are flushed after this long even if the batch is not full
+    WRITE_FLUSH_SECONDS = float(os.getenv("VECTOR_WRITE_FLUSH_SECONDS", "0.5"))
+    # Failed batch writes are retried in the background with exponential backoff, then dropped
+    WRITE_RETRIES = int(os.getenv("VECTOR_WRITE_RETRIES", "3"))
+    WRITE_RETRY_BACKOFF_SECONDS = float(os.getenv("VECTOR_WRITE_RETRY_BACKOFF_SECONDS", "0.5"))
+
+def parse_routes(spec: str) -> Dict[str, List[str]]:
+    """Parse "collection=a,b;other=c" into {collection: [backend, ...]}"""
+    routes = {}
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        collection, _, names = entry.partition("=")
+        routes[collection.strip()] = [name.strip() for name in names.split(",") if name.strip()]
+    return routes
+
+class BackendHealth:
+    """Sliding-window latency and error tracking for one backend"""
+
+    def __init__(self, window: int):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def record(self, seconds: float, ok: bool, timed_out: bool = False):
+        with self._lock:
+            self._latencies.append(seconds)
+            self._outcomes.append(ok)
+            self.requests += 1
+            self.errors += not ok
+            self.timeouts += timed_out
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return 1.0 - sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def stats(self) -> dict:
+        p50, p99 = self.percentile(0.5), self.percentile(0.99)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "error_rate": self.error_rate,
+            "p50_ms": p50 * 1000 if p50 is not None else None,
+            "p99_ms": p99 * 1000 if p99 is not None else None,
+        }
+
+class WriteBatcher:
+    """Buffers upserts for one backend and flushes them in its batch size"""
+
+    def __init__(self, router: "VectorBackendRouter", store: VectorStore):
+        self.router = router
+        self.store = store
+        self._buffer: List[tuple] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._retries: Set[asyncio.Task] = set()
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.retrying = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def add(self, rows: List[tuple]):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.store.write_batch_size:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(RoutingConfig.WRITE_FLUSH_SECONDS)
+        await self.flush()
+
+    async def _write(self, rows: List[tuple]) -> bool:
+        ids, embeddings, documents, metadatas = (list(column) for column in zip(*rows))
+        try:
+            await self.router.run(self.store, self.store.upsert, ids, embeddings, documents, metadatas, write=True)
+        except Exception as e:
+            self.failed += len(rows)
+            print(f"✗ Vector write of {len(rows)} to {self.store.name} failed: {e}")
+            return False
+        self.written += len(rows)
+        return True
+
+    async def flush(self):
+        while self._buffer:
+            rows = self._buffer[:self.store.write_batch_size]
+            del self._buffer[:len(rows)]
+            if not await self._write(rows):
+                self._schedule_retry(rows, 1)
+            self.flushes += 1
+
+    def _schedule_retry(self, rows: List[tuple], attempt: int):
+        if attempt > RoutingConfig.WRITE_RETRIES:
+            self.dropped += len(rows)
+            print(f"✗ Dropped {len(rows)} vectors for {self.store.name} after {RoutingConfig.WRITE_RETRIES} retries")
+            return
+        # Retried off the write path so one failing backend does not stall ingestion
+        self.retrying += len(rows)
+        task = asyncio.create_task(self._retry(rows, attempt))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _retry(self, rows: List[tuple], attempt: int):
+        try:
+            await asyncio.sleep(RoutingConfig.WRITE_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        except asyncio.CancelledError:
+            self.dropped += len(rows)
+            raise
+        finally:
+            self.retrying -= len(rows)
+        self.retried += len(rows)
+        if not await self._write(rows):
+            self._schedule_retry(rows, attempt + 1)
+
+    async def drain(self):
+        """Flush the buffer and wait for scheduled retries to finish"""
+        await self.flush()
+        while self._retries:
+            await asyncio.gather(*self._retries, return_exceptions=True)
+
+class VectorBackendRouter:
+    """Picks backends per collection, ordered by configuration and health"""
+
+    def __init__(self, stores: Dict[str, VectorStore], routes: Dict[str, List[str]], default_route: List[str]):
+        self.stores = stores
+        self.routes = routes
+        self.default_route = default_route
+        # Reads drive routing; bulk writes are tracked apart so they cannot skew it
+        self.health = {name: BackendHealth(RoutingConfig.LATENCY_WINDOW) for name in stores}
+        self.write_health = {name: BackendHealth(RoutingConfig.LATENCY_WINDOW) for name in stores}
+        self._executors = {
+            name: ThreadPoolExecutor(max_workers=RoutingConfig.WORKERS_PER_BACKEND, thread_name_prefix=f"vector-{name}")
+            for name in stores
+        }
+        self._batchers = {name: WriteBatcher(self, store) for name, store in stores.items()}
+        self.failovers = 0
+        self.deadline_misses = 0
+
+    def route(self, collection: str) -> List[VectorStore]:
+        """Configured backends for a collection, in preference order"""
+        names = self.routes.get(collection, self.default_route)
+        return [self.stores[name] for name in names if name in self.stores and self.stores[name].configured]
+
+    def ranked(self, collection: str) -> List[VectorStore]:
+        """Route order with backends above the error-rate limit moved last"""
+        route = self.route(collection)
+        return sorted(route, key=lambda store: (
+            self.health[store.name].error_rate > RoutingConfig.MAX_ERROR_RATE, route.index(store)
+        ))
+
+    def _attempt_timeout(self, store: VectorStore, remaining: float, backends_left: int) -> float:
+        p99 = self.health[store.name].percentile(0.99)
+        if p99 is None:
+            # No history yet: leave the later backends their share of the deadline
+            return remaining / backends_left
+        return min(remaining, max(p99 * RoutingConfig.ATTEMPT_P99_MULTIPLIER, RoutingConfig.MIN_ATTEMPT_SECONDS))
+
+    async def run(self, store: VectorStore, fn, *args, timeout: Optional[float] = None, write: bool = False):
+        """Run a blocking store call in the backend's pool, recording its read or write health"""
+        health = (self.write_health if write else self.health)[store.name]
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(loop.run_in_executor(self._executors[store.name], fn, *args), timeout)
+        except asyncio.TimeoutError:
+            health.record(time.perf_counter() - started, ok=False, timed_out=True)
+            raise
+        except Exception:
+            health.record(time.perf_counter() - started, ok=False)
+            raise
+        health.record(time.perf_counter() - started, ok=True)
+        return result
+
+    async def query(
+        self,
+        collection: str,
+        embedding: List[float],
+        user_id: int,
+        conversation_id: Optional[int] = None,
+        limit: int = 5,
+        threshold: float = 0.0,
+        deadline_seconds: Optional[float] = None,
+        mode: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Query a collection within the deadline, best match first"""
+        backends = self.ranked(collection)
+        if not backends:
+            return []
+        deadline = time.monotonic() + (deadline_seconds or RoutingConfig.QUERY_DEADLINE_SECONDS)
+        args = (embedding, user_id, conversation_id, limit)
+        mode = mode or RoutingConfig.QUERY_MODE
+
+        if mode == "failover":
+            results = await self._query_failover(backends, args, deadline)
+        else:
+            results = await self._query_fanout(backends, args, deadline, merge=(mode == "merged"))
+        return [result for result in results if result["score"] >= threshold][:limit]
+
+    async def _query_failover(self, backends: List[VectorStore], args: tuple, deadline: float):
+        for position, store in enumerate(backends):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                return await self.run(store, store.query, *args, timeout=self._attempt_timeout(store, remaining, len(backends) - position))
+            except Exception as e:
+                if position + 1 < len(backends):
+                    self.failovers += 1
+                print(f"⚠️  Vector query on {store.name} failed, failing over: {str(e) or type(e).__name__}")
+        self.deadline_misses += 1
+        return []
+
+    async def _query_fanout(self, backends: List[VectorStore], args: tuple, deadline: float, merge: bool):
+        tasks = {
+            asyncio.ensure_future(self.run(store, store.query, *args, timeout=deadline - time.monotonic())): store
+            for store in backends
+        }
+        pending = set(tasks)
+        answered = []
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.deadline_misses += 1
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        answered.append(task.result())
+                if answered and not merge:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if not merge:
+            return answered[0] if answered else []
+        best: Dict[str, Dict[str, Any]] = {}
+        for results in answered:
+            for result in results:
+                if result["id"] not in best or result["score"] > best[result["id"]]["score"]:
+                    best[result["id"]] = result
+        return sorted(best.values(), key=lambda result: result["score"], reverse=True)
+
+    async def write(self, collection: str, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Buffer vectors for every backend on the route so any of them can serve reads"""
+        rows = list(zip(ids, embeddings, documents, metadatas))
+        await asyncio.gather(*(self._batchers[store.name].add(rows) for store in self.route(collection)))
+
+    async def flush(self):
+        """Write out all buffered vectors"""
+        await asyncio.gather(*(batcher.flush() for batcher in self._batchers.values()))
+
+    async def close(self):
+        await asyncio.gather(*(batcher.drain() for batcher in self._batchers.values()))
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Get per-backend read latency and errors, plus write statistics"""
+        return {
+            "mode": RoutingConfig.QUERY_MODE,
+            "routes": self.routes,
+            "failovers": self.failovers,
+            "deadline_misses": self.deadline_misses,
+            "backends": {
+                name: {
+                    **self.health[name].stats(),
+                    "writes": self.write_health[name].stats(),
+                    "pending_writes": self._batchers[name].pending,
+                    "written": self._batchers[name].written,
+                    "write_failures": self._batchers[name].failed,
+                    "write_retries": self._batchers[name].retried,
+                    "retrying_writes": self._batchers[name].retrying,
+                    "dropped_writes": self._batchers[name].dropped,
+                }
+                for name, store in self.stores.items() if store.configured
+            },
+        }
+
+# Global instance
+vector_router = VectorBackendRouter(
+    stores,
+    parse_routes(RoutingConfig.ROUTES),
+    [name.strip() for name in RoutingConfig.DEFAULT_ROUTE.split(",") if name.strip()],
+)
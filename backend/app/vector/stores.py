@@ -0,0 +1,224 @@
+"""
+Message vector stores behind a common interface
+Each adapter maps upsert/query onto one backend client library
+"""
+
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .backends import chroma_backend, weaviate_backend, pinecone_backend, LazyBackend, BackendConfig
+from .local_index import local_index
+from .ingest import IngestConfig
+
+# Vector store configuration
+class StoreConfig:
+    WEAVIATE_CLASS = os.getenv("WEAVIATE_MESSAGE_CLASS", "Message")
+    PINECONE_INDEX = os.getenv("PINECONE_INDEX", "messages")
+
+class BackendUnavailableError(Exception):
+    """Raised when a backend client cannot be obtained"""
+
+class VectorStore:
+    """Upsert and query message vectors in one backend.
+
+    Methods are blocking and run in the router's per-backend thread pool.
+    Query results are dicts with ``id``, ``content``, ``metadata`` and a
+    cosine-similarity ``score``.
+    """
+
+    name = ""
+    # Preferred number of vectors per write call
+    write_batch_size = 100
+    # False for stores that live in this process's files and allow one writer
+    shared = True
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def query(self, embedding: List[float], user_id: int, conversation_id: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Open connections and collections ahead of the first request"""
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+class _LazyClientStore(VectorStore):
+    backend: LazyBackend
+
+    @property
+    def configured(self) -> bool:
+        return self.backend.configured
+
+    def _client(self):
+        client = self.backend.get()
+        if client is None:
+            raise BackendUnavailableError(f"{self.backend.name} is not available")
+        return client
+
+class ChromaStore(_LazyClientStore):
+    name = "chroma"
+    backend = chroma_backend
+    write_batch_size = 500
+    shared = bool(BackendConfig.CHROMA_HOST)
+
+    def __init__(self):
+        self._collection = None
+        self._lock = threading.Lock()
+
+    def collection(self):
+        if self._collection is None:
+            client = self._client()
+            with self._lock:
+                if self._collection is None:
+                    self._collection = client.get_or_create_collection(
+                        IngestConfig.COLLECTION_NAME, metadata={"hnsw:space": "cosine"}
+                    )
+        return self._collection
+
+    def warm_up(self):
+        self.collection()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection().upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, embedding, user_id, conversation_id, limit):
+        where = {"user_id": user_id}
+        if conversation_id is not None:
+            where = {"$and": [where, {"conversation_id": conversation_id}]}
+        found = self.collection().query(
+            query_embeddings=[embedding],
+            n_results=limit,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            # Cosine distance in the collection, reported as similarity
+            {"id": doc_id, "content": content, "metadata": metadata, "score": 1.0 - distance}
+            for doc_id, content, metadata, distance in zip(
+                found["ids"][0], found["documents"][0], found["metadatas"][0], found["distances"][0]
+            )
+        ]
+
+class WeaviateStore(_LazyClientStore):
+    name = "weaviate"
+    backend = weaviate_backend
+    write_batch_size = 100
+
+    _PROPERTIES = ["content", "message_id", "user_id", "conversation_id", "role", "created_at"]
+
+    def __init__(self):
+        self._schema_ready = False
+
+    def _ready_client(self):
+        client = self._client()
+        if not self._schema_ready:
+            if not client.schema.exists(StoreConfig.WEAVIATE_CLASS):
+                client.schema.create_class({
+                    "class": StoreConfig.WEAVIATE_CLASS,
+                    "vectorizer": "none",
+                    "vectorIndexConfig": {"distance": "cosine"},
+                    # Explicit types so IDs filter with valueInt
+                    "properties": [
+                        {"name": "content", "dataType": ["text"]},
+                        {"name": "message_id", "dataType": ["text"]},
+                        {"name": "user_id", "dataType": ["int"]},
+                        {"name": "conversation_id", "dataType": ["int"]},
+                        {"name": "role", "dataType": ["text"]},
+                        {"name": "created_at", "dataType": ["number"]},
+                    ],
+                })
+            self._schema_ready = True
+        return client
+
+    def warm_up(self):
+        self._ready_client()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        client = self._ready_client()
+        client.batch.configure(batch_size=self.write_batch_size)
+        with client.batch as batch:
+            for doc_id, embedding, content, metadata in zip(ids, embeddings, documents, metadatas):
+                batch.add_data_object(
+                    {**metadata, "content": content, "message_id": doc_id},
+                    StoreConfig.WEAVIATE_CLASS,
+                    uuid=str(uuid.uuid5(uuid.NAMESPACE_URL, f"message/{doc_id}")),
+                    vector=embedding,
+                )
+
+    def query(self, embedding, user_id, conversation_id, limit):
+        operands = [{"path": ["user_id"], "operator": "Equal", "valueInt": user_id}]
+        if conversation_id is not None:
+            operands.append({"path": ["conversation_id"], "operator": "Equal", "valueInt": conversation_id})
+        found = (
+            self._ready_client().query
+            .get(StoreConfig.WEAVIATE_CLASS, self._PROPERTIES)
+            .with_near_vector({"vector": embedding})
+            .with_where({"operator": "And", "operands": operands})
+            .with_limit(limit)
+            .with_additional(["distance"])
+            .do()
+        )
+        results = []
+        for item in found.get("data", {}).get("Get", {}).get(StoreConfig.WEAVIATE_CLASS) or []:
+            distance = item.pop("_additional", {}).get("distance", 1.0)
+            content = item.pop("content", "")
+            doc_id = item.pop("message_id", "")
+            metadata = {key: value for key, value in item.items() if value is not None}
+            results.append({"id": str(doc_id), "content": content, "metadata": metadata, "score": 1.0 - distance})
+        return results
+
+class PineconeStore(_LazyClientStore):
+    name = "pinecone"
+    backend = pinecone_backend
+    write_batch_size = 100
+
+    def __init__(self):
+        self._index = None
+
+    def index(self):
+        if self._index is None:
+            self._index = self._client().Index(StoreConfig.PINECONE_INDEX)
+        return self._index
+
+    def warm_up(self):
+        self.index()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.index().upsert(vectors=[
+            (doc_id, embedding, {**metadata, "content": content})
+            for doc_id, embedding, content, metadata in zip(ids, embeddings, documents, metadatas)
+        ])
+
+    def query(self, embedding, user_id, conversation_id, limit):
+        where = {"user_id": {"$eq": user_id}}
+        if conversation_id is not None:
+            where["conversation_id"] = {"$eq": conversation_id}
+        found = self.index().query(vector=embedding, top_k=limit, filter=where, include_metadata=True)
+        results = []
+        for match in found.matches:
+            metadata = dict(match.metadata or {})
+            content = metadata.pop("content", "")
+            results.append({"id": match.id, "content": content, "metadata": metadata, "score": match.score})
+        return results
+
+class LocalStore(VectorStore):
+    name = "local"
+    write_batch_size = 1000
+    shared = False
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        local_index.upsert(ids, embeddings, documents, metadatas)
+
+    def query(self, embedding, user_id, conversation_id, limit):
+        # The router applies the similarity threshold
+        return local_index.search(user_id, embedding, limit, -1.0, conversation_id)
+
+# Global instances
+stores: Dict[str, VectorStore] = {
+    store.name: store for store in (ChromaStore(), WeaviateStore(), PineconeStore(), LocalStore())
+}
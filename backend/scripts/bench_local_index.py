@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the local memory-mapped vector index
+Fills one user shard with random normalized vectors and times top-k search
+with and without a conversation filter
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.vector.local_index import LocalVectorIndex
+
+VECTORS = int(os.getenv("BENCH_VECTORS", "300000"))
+DIMENSION = int(os.getenv("BENCH_DIMENSION", "384"))
+CONVERSATIONS = 1000
+BATCH = 10000
+
+def main():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(path)
+
+        started = time.perf_counter()
+        for start in range(0, VECTORS, BATCH):
+            ids = range(start, min(start + BATCH, VECTORS))
+            vectors = rng.standard_normal((len(ids), DIMENSION)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            index.upsert(
+                [str(i) for i in ids],
+                vectors,
+                [f"message {i}" for i in ids],
+                [{"user_id": 1, "conversation_id": i % CONVERSATIONS} for i in ids],
+            )
+        print(f"Indexed {VECTORS} x {DIMENSION} vectors in {time.perf_counter() - started:.1f}s")
+
+        query = rng.standard_normal(DIMENSION).astype(np.float32)
+        query /= np.linalg.norm(query)
+        for label, conversation_id in (("all messages", None), ("one conversation", 7)):
+            timings = []
+            for _ in range(20):
+                started = time.perf_counter()
+                results = index.search(1, query, limit=5, threshold=-1.0, conversation_id=conversation_id)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(f"  {label:<17} p50 {timings[10] * 1000:7.2f} ms  max {timings[-1] * 1000:7.2f} ms  ({len(results)} results)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the application module
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+fails when the cumulative import time exceeds the budget or when a vector
+backend / ML library is imported eagerly at startup
+"""
+
+import os
+import re
+import sys
+import subprocess
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Cumulative time allowed for `import app.main`
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2500"))
+
+# Modules that must only be imported on first use
+LAZY_MODULES = ("chromadb", "weaviate", "pinecone", "sentence_transformers", "torch")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure(module: str = "app.main"):
+    """Return [(cumulative_us, depth, name)] for one cold import"""
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "import-time-check-secret")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else "import failed")
+        sys.exit(2)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            entries.append((int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return entries
+
+def main():
+    entries = measure()
+    total_ms = next(us for us, _, name in entries if name == "app.main") / 1000
+
+    print("Slowest top-level imports:")
+    top_level = sorted((e for e in entries if e[1] == 0), reverse=True)[:10]
+    for us, _, name in top_level:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    eager = sorted({name.split(".")[0] for _, _, name in entries if name.split(".")[0] in LAZY_MODULES})
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    if total_ms > BUDGET_MS:
+        failures.append(f"import app.main took {total_ms:.0f} ms (budget {BUDGET_MS:.0f} ms)")
+
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print(f"✓ import app.main took {total_ms:.0f} ms (budget {BUDGET_MS:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
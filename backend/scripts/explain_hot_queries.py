@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN check for the chat hot-path queries
+Seeds a scratch schema with millions of rows and verifies each query is
+served by its index rather than a sequential scan
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import select, desc, text
+from sqlalchemy.dialects import postgresql
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import Base, engine, Conversation, Message, UserAPIKey
+
+SCHEMA = "explain_check"
+
+def seed(connection, users: int, conversations: int, messages: int):
+    """Fill the scratch schema with synthetic rows"""
+    connection.execute(text(f"""
+        INSERT INTO {SCHEMA}.users (id, username, email, hashed_password, is_active, created_at, updated_at, preferences)
+        SELECT g, 'user' || g, 'user' || g || '@example.com', 'x', true, now(), now(), '{{}}'::json
+        FROM generate_series(1, :users) g
+    """), {"users": users})
+    connection.execute(text(f"""
+        INSERT INTO {SCHEMA}.user_api_keys (id, user_id, provider, name, encrypted_key, is_active, created_at)
+        SELECT g, (g % :users) + 1, 'openai', 'key' || g, 'x', g % 4 <> 0, now()
+        FROM generate_series(1, :users * 3) g
+    """), {"users": users})
+    connection.execute(text(f"""
+        INSERT INTO {SCHEMA}.conversations (id, user_id, title, is_active, created_at, updated_at, message_count)
+        SELECT g, (g % :users) + 1, 'Chat ' || g, true, now(), now() - (g || ' seconds')::interval, 0
+        FROM generate_series(1, :conversations) g
+    """), {"users": users, "conversations": conversations})
+    connection.execute(text(f"""
+        INSERT INTO {SCHEMA}.messages (id, conversation_id, role, content, created_at)
+        SELECT g, (g % :conversations) + 1, CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END,
+               'message ' || g, now() + (g || ' milliseconds')::interval
+        FROM generate_series(1, :messages) g
+    """), {"conversations": conversations, "messages": messages})
+    connection.execute(text(f"ANALYZE {SCHEMA}.users, {SCHEMA}.user_api_keys, {SCHEMA}.conversations, {SCHEMA}.messages"))
+
+def hot_queries():
+    """Hot-path queries paired with the index each must use"""
+    return {
+        "get_conversation_messages": (
+            select(Message).where(Message.conversation_id == 42)
+            .order_by(Message.created_at).limit(100),
+            "ix_messages_conversation_id_created_at",
+        ),
+        "get_recent_messages": (
+            select(Message.id, Message.role, Message.content, Message.created_at)
+            .where(Message.conversation_id == 42)
+            .order_by(desc(Message.created_at), desc(Message.id)).limit(50),
+            "ix_messages_conversation_id_created_at",
+        ),
+        "get_user_conversations": (
+            select(Conversation).where(Conversation.user_id == 7)
+            .order_by(desc(Conversation.updated_at)).limit(50),
+            "ix_conversations_user_id_updated_at",
+        ),
+        "get_user_api_keys": (
+            select(UserAPIKey).where(UserAPIKey.user_id == 7, UserAPIKey.is_active == True),
+            "ix_user_api_keys_user_id_active",
+        ),
+    }
+
+def plan_nodes(plan: dict):
+    """Walk every node of a JSON EXPLAIN plan"""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--conversations", type=int, default=200_000)
+    parser.add_argument("--messages", type=int, default=2_000_000)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema afterwards")
+    args = parser.parse_args()
+
+    scratch_engine = engine.execution_options(schema_translate_map={None: SCHEMA})
+    failures = 0
+
+    with scratch_engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(bind=connection)
+
+        print(f"Seeding {args.messages:,} messages in {args.conversations:,} conversations...")
+        started = time.perf_counter()
+        seed(connection, args.users, args.conversations, args.messages)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    try:
+        with scratch_engine.connect() as connection:
+            connection.execute(text(f"SET search_path TO {SCHEMA}"))
+            for name, (query, index_name) in hot_queries().items():
+                sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+                plan = connection.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")).scalar()[0]
+                nodes = list(plan_nodes(plan["Plan"]))
+                used = {node.get("Index Name") for node in nodes if node.get("Index Name")}
+                seq_scans = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+
+                ok = index_name in used and not seq_scans
+                failures += not ok
+                print(f"{'✅' if ok else '❌'} {name}: {plan['Execution Time']:.2f}ms "
+                      f"indexes={sorted(used) or '-'} seq_scans={seq_scans or '-'}")
+    finally:
+        if not args.keep:
+            with scratch_engine.begin() as connection:
+                connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())